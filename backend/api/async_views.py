@@ -0,0 +1,76 @@
+import asyncio
+import contextvars
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from django.urls import URLPattern
+from rest_framework.permissions import SAFE_METHODS
+
+ASYNC_READ_ROUTES = (
+    'recipes-list',
+    'recipes-detail',
+    'recipes-feed',
+    'tags-list',
+    'tags-detail',
+    'ingredients-list',
+    'ingredients-detail',
+    'users-subscriptions',
+)
+
+executor = ThreadPoolExecutor(
+    max_workers=settings.ASYNC_VIEWS['WORKERS'],
+    thread_name_prefix='api-read',
+)
+
+
+def run_view(view, request, *args, **kwargs):
+    """Выполняет view в потоке пула, как отдельный запрос к БД."""
+    close_old_connections()
+    try:
+        response = view(request, *args, **kwargs)
+        if hasattr(response, 'render'):
+            response.render()
+        return response
+    finally:
+        close_old_connections()
+
+
+def async_read_view(view):
+    """Асинхронная обёртка над синхронным view.
+
+    Чтение выполняется в пуле потоков, поэтому медленный запрос к БД
+    не занимает цикл событий и общий поток синхронных view. Остальные
+    методы идут обычным путём Django.
+    """
+    sync_view = sync_to_async(view)
+
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method not in SAFE_METHODS:
+            return await sync_view(request, *args, **kwargs)
+        context = contextvars.copy_context()
+        return await asyncio.get_running_loop().run_in_executor(
+            executor,
+            functools.partial(
+                context.run, run_view, view, request, *args, **kwargs
+            ),
+        )
+
+    return wrapper
+
+
+def with_async_reads(urlpatterns):
+    """Подменяет view маршрутов чтения асинхронными, если они включены."""
+    if not settings.ASYNC_VIEWS['ENABLED']:
+        return urlpatterns
+    return [
+        URLPattern(
+            pattern.pattern, async_read_view(pattern.callback),
+            pattern.default_args, pattern.name,
+        )
+        if pattern.name in ASYNC_READ_ROUTES else pattern
+        for pattern in urlpatterns
+    ]
@@ -0,0 +1,110 @@
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.utils.crypto import salted_hmac
+from django.utils.translation import gettext_lazy as _
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.exceptions import AuthenticationFailed
+
+from foodgram.db_router import primary_db
+from users.models import User
+
+signer = signing.TimestampSigner(salt='api.authentication')
+
+
+def token_cache_key(key):
+    return f'auth:token:{key}'
+
+
+def user_cache_key(user_id):
+    return f'auth:user:{user_id}'
+
+
+def revoked_cache_key(token_id):
+    return f'auth:revoked:{token_id}'
+
+
+def get_token_id(key):
+    """Идентификатор токена DRF, по которому нельзя восстановить ключ."""
+    return salted_hmac('api.authentication.token', key).hexdigest()
+
+
+def sign_token(token):
+    """Подписанный токен: id пользователя и идентификатор токена DRF.
+
+    Подпись не шифрует данные, поэтому сам ключ в токен не попадает.
+    """
+    return signer.sign_object(
+        {'u': token.user_id, 't': get_token_id(token.key)}
+    )
+
+
+def invalidate_token(key):
+    cache.delete(token_cache_key(key))
+    if settings.AUTH_TOKEN['SIGNED']:
+        cache.set(
+            revoked_cache_key(get_token_id(key)), True,
+            timeout=settings.AUTH_TOKEN['SIGNED_MAX_AGE']
+        )
+
+
+def invalidate_user(user_id, token_keys):
+    cache.delete_many(
+        [user_cache_key(user_id)]
+        + [token_cache_key(key) for key in token_keys]
+    )
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication с кэшированием пользователя по токену.
+
+    Обычный токен DRF разрешается в пользователя через кэш
+    с коротким TTL. Подписанный токен (AUTH_TOKEN['SIGNED'])
+    проверяется без обращения к БД: подпись и срок жизни проверяет
+    signing, отзыв при выходе - метка в кэше. Когда подписанные
+    токены включены, ключи DRF без подписи не принимаются. Без общего
+    для всех воркеров кэша (settings.SHARED_CACHE) выход в одном
+    воркере не виден другим, поэтому кэш не используется, а подписанные
+    токены отключены в настройках.
+    """
+
+    def authenticate_credentials(self, key):
+        if settings.AUTH_TOKEN['SIGNED']:
+            return self.authenticate_signed(key)
+        if not settings.SHARED_CACHE:
+            with primary_db():
+                return super().authenticate_credentials(key)
+        cache_key = token_cache_key(key)
+        credentials = cache.get(cache_key)
+        if credentials is None:
+            with primary_db():
+                credentials = super().authenticate_credentials(key)
+            cache.set(
+                cache_key, credentials,
+                timeout=settings.AUTH_TOKEN['CACHE_TIMEOUT']
+            )
+        return credentials
+
+    def authenticate_signed(self, signed_key):
+        try:
+            payload = signer.unsign_object(
+                signed_key, max_age=settings.AUTH_TOKEN['SIGNED_MAX_AGE']
+            )
+        except signing.BadSignature:
+            raise AuthenticationFailed(_('Invalid token.'))
+        if 't' not in payload or cache.get(revoked_cache_key(payload['t'])):
+            raise AuthenticationFailed(_('Invalid token.'))
+        cache_key = user_cache_key(payload['u'])
+        user = cache.get(cache_key)
+        if user is None:
+            with primary_db():
+                user = User.objects.filter(pk=payload['u']).first()
+            if user is None:
+                raise AuthenticationFailed(_('Invalid token.'))
+            cache.set(
+                cache_key, user,
+                timeout=settings.AUTH_TOKEN['CACHE_TIMEOUT']
+            )
+        if not user.is_active:
+            raise AuthenticationFailed(_('User inactive or deleted.'))
+        return user, payload['t']
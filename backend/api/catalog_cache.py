@@ -0,0 +1,132 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from django.conf import settings
+from django.core.cache import cache
+
+from foodgram.consts import CATALOG_CACHE_TIMEOUT, CATALOG_LRU_SIZE
+from foodgram.db_router import primary_db
+from recipes.models import Tag
+
+CatalogEntry = namedtuple('CatalogEntry', ('body', 'last_modified'))
+
+
+class CatalogCache:
+    """Версионируемый кэш сериализованных данных API.
+
+    Используется для справочников (теги, ингредиенты) и ленты рецептов.
+    Первый уровень - LRU в памяти процесса, второй - кэш Django
+    (Memcached из CACHES), общий для всех воркеров. Ключи содержат
+    версию справочника, которая хранится в кэше Django и меняется при
+    любом изменении записей, поэтому устаревшие записи просто перестают
+    читаться. Версия - время изменения в микросекундах, из неё же
+    берётся заголовок Last-Modified.
+
+    Без общего кэша (settings.SHARED_CACHE) изменение в одном воркере
+    не видно другим, поэтому кэширование отключается: каждое обращение
+    строит значение заново. Версия тогда хранится в процессе и меняется
+    только его собственными изменениями.
+    """
+
+    registry = {}
+
+    def __init__(self, name, maxsize=CATALOG_LRU_SIZE):
+        self.name = name
+        self.maxsize = maxsize
+        self.stats = {'local_hits': 0, 'shared_hits': 0, 'misses': 0}
+        self._local = OrderedDict()
+        self._local_version = self.new_version()
+        self._lock = threading.Lock()
+        self.registry[name] = self
+
+    @property
+    def version_key(self):
+        return f'catalog:{self.name}:version'
+
+    @staticmethod
+    def new_version():
+        return int(time.time() * 1_000_000)
+
+    def version(self):
+        if not settings.SHARED_CACHE:
+            return self._local_version
+        return cache.get_or_set(
+            self.version_key, self.new_version, timeout=None
+        )
+
+    def bump(self):
+        self._local_version = self.new_version()
+        cache.set(self.version_key, self.new_version(), timeout=None)
+
+    def clear_local(self):
+        """Очищает LRU процесса, например перед холодным замером."""
+        with self._lock:
+            self._local.clear()
+
+    def get(self, params, build):
+        """Возвращает CatalogEntry, вызывая build() только при промахе."""
+        def build_entry(version):
+            return CatalogEntry(
+                body=build(), last_modified=version // 1_000_000
+            )
+        return self.get_value(('response', params), build_entry)
+
+    def get_value(self, params, build):
+        """Возвращает произвольное значение, построенное build(version)."""
+        version = self.version()
+        if not settings.SHARED_CACHE:
+            with self._lock:
+                self.stats['misses'] += 1
+            return build(version)
+        params_hash = hashlib.md5(repr(params).encode()).hexdigest()
+        key = f'catalog:{self.name}:{version}:{params_hash}'
+        with self._lock:
+            value = self._local.get(key)
+            if value is not None:
+                self._local.move_to_end(key)
+                self.stats['local_hits'] += 1
+                return value
+        value = cache.get(key)
+        if value is None:
+            # Кэш живёт дольше запроса, поэтому строится по основной базе,
+            # а не по реплике с возможным отставанием.
+            with primary_db():
+                value = build(version)
+            cache.set(key, value, timeout=CATALOG_CACHE_TIMEOUT)
+            stat = 'misses'
+        else:
+            stat = 'shared_hits'
+        with self._lock:
+            self.stats[stat] += 1
+            self._local[key] = value
+            while len(self._local) > self.maxsize:
+                self._local.popitem(last=False)
+        return value
+
+
+tags_cache = CatalogCache('tags')
+ingredients_cache = CatalogCache('ingredients')
+recipes_cache = CatalogCache('recipes')
+users_cache = CatalogCache('users')
+
+
+def tag_ids_for_slugs(slugs):
+    """id тегов по слагам из кэша справочника; неизвестные пропускаются."""
+    slug_map = tags_cache.get_value(
+        ('slug_map',),
+        lambda version: dict(Tag.objects.values_list('slug', 'id'))
+    )
+    return [slug_map[slug] for slug in slugs if slug in slug_map]
+
+
+def cache_metrics():
+    """Статистика кэшей для /metrics."""
+    yield ('# HELP foodgram_catalog_cache_total '
+           'Обращения к кэшам API по результату.')
+    yield '# TYPE foodgram_catalog_cache_total counter'
+    for name, catalog in CatalogCache.registry.items():
+        for event, count in catalog.stats.items():
+            yield (f'foodgram_catalog_cache_total'
+                   f'{{cache="{name}",event="{event}"}} {count}')
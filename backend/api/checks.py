@@ -0,0 +1,16 @@
+from django.conf import settings
+from django.core.checks import Warning, register
+
+
+@register()
+def shared_cache_check(app_configs, **kwargs):
+    """Кэши API, ETag и подписанные токены требуют общего кэша."""
+    if settings.SHARED_CACHE:
+        return []
+    return [Warning(
+        'Кэш Django хранится в памяти процесса: кэши API, ETag и '
+        'подписанные токены отключены.',
+        hint='Укажите CACHE_BACKEND и CACHE_LOCATION общего кэша, '
+             'например Memcached.',
+        id='api.W001',
+    )]
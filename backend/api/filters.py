@@ -1,27 +1,77 @@
+from django import forms
+from django.db.models import Exists, OuterRef
 from django_filters.rest_framework import FilterSet, filters
 from rest_framework.filters import SearchFilter
 
-from recipes.models import Ingredient, Recipe
+from .catalog_cache import tag_ids_for_slugs
+from .search import ingredient_search, recipe_search
+from recipes.models import Ingredient, Recipe, TagInRecipes
 
 
 class IngredientFilter(SearchFilter):
     search_param = 'name'
 
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '').strip()
+        if not query:
+            return queryset
+        return ingredient_search.search(queryset, query)
+
     class Meta:
         model = Ingredient
         fields = ('name',)
 
 
+class SlugsField(forms.Field):
+    """Список слагов из повторяющегося параметра (?tags=a&tags=b)."""
+
+    widget = forms.SelectMultiple
+
+    def to_python(self, value):
+        if not value:
+            return []
+        return [str(slug) for slug in value]
+
+
+class TagSlugsFilter(filters.Filter):
+    """Фильтр по слагам тегов без запроса списка вариантов и без JOIN.
+
+    Слаги переводятся в id по кэшу справочника тегов, рецепты
+    отбираются полусоединением EXISTS, поэтому дубликатов нет.
+    """
+
+    field_class = SlugsField
+
+    def filter(self, qs, value):
+        if not value:
+            return qs
+        tag_ids = tag_ids_for_slugs(value)
+        if not tag_ids:
+            return qs.none()
+        return qs.filter(Exists(TagInRecipes.objects.filter(
+            recipe=OuterRef('pk'), tag_id__in=tag_ids
+        )))
+
+
 class RecipeFilter(FilterSet):
 
-    tags = filters.AllValuesMultipleFilter(field_name='tags__slug')
+    tags = TagSlugsFilter()
+    search = filters.CharFilter(method='filter_search')
     is_favorited = filters.BooleanFilter(method='filter_is_favorited')
     is_in_shopping_cart = filters.BooleanFilter(
         method='filter_is_in_shopping_cart')
 
     class Meta:
         model = Recipe
-        fields = ('author', 'tags', 'is_favorited', 'is_in_shopping_cart')
+        fields = (
+            'author', 'tags', 'search', 'is_favorited', 'is_in_shopping_cart'
+        )
+
+    def filter_search(self, queryset, name, value):
+        value = value.strip()
+        if not value:
+            return queryset
+        return recipe_search.search(queryset, value)
 
     def filter_is_favorited(self, queryset, name, value):
         if value and self.request.user.is_authenticated:
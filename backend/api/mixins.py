@@ -0,0 +1,181 @@
+import hashlib
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework import status
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.response import Response
+
+from .catalog_cache import recipes_cache
+from .renderers import JSONRenderer
+from .response_cache import is_cacheable, personalize
+from foodgram.db_router import reset_replica, use_replica
+
+
+class ConditionalResponseError(Exception):
+    """Прерывает обработку запроса готовым ответом 304 или 412."""
+
+    def __init__(self, response):
+        super().__init__(response.status_code)
+        self.response = response
+
+
+def weak_etag(parts):
+    return f'W/"{hashlib.md5(repr(parts).encode()).hexdigest()}"'
+
+
+class ReplicaReadMixin:
+    """Читает с реплики в действиях replica_actions вьюсета.
+
+    Остальные действия и представления (админка, /users/me/, чтение
+    сразу после записи) работают с основной базой.
+    """
+
+    replica_actions = ('list', 'retrieve')
+
+    def dispatch(self, request, *args, **kwargs):
+        token = use_replica(
+            request.method in SAFE_METHODS
+            and self.action_map.get(request.method.lower())
+            in self.replica_actions
+        )
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            reset_replica(token)
+
+
+class ConditionalGetMixin:
+    """Условные GET-запросы по ETag, построенному без сериализации.
+
+    ETag собирается из версий данных (get_etag_parts), действия,
+    параметров URL и запроса. При совпадении с If-None-Match
+    ответ 304 возвращается до обращения к БД и сериализатору.
+    Без общего кэша (settings.SHARED_CACHE) версии у воркеров разные,
+    и ETag не выставляется; не выставляется он и для представлений,
+    не переопределивших get_etag_parts.
+    """
+
+    conditional_actions = ('list', 'retrieve')
+
+    def get_etag_parts(self, request):
+        return ()
+
+    def handle_exception(self, exc):
+        if isinstance(exc, ConditionalResponseError):
+            return exc.response
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        etag = getattr(self, 'etag', None)
+        if etag and response.status_code in (
+            status.HTTP_200_OK, status.HTTP_304_NOT_MODIFIED
+        ):
+            response['ETag'] = etag
+        return super().finalize_response(request, response, *args, **kwargs)
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self.etag = None
+        if not (settings.SHARED_CACHE and request.method in ('GET', 'HEAD')
+                and self.action in self.conditional_actions):
+            return
+        parts = self.get_etag_parts(request)
+        if not parts:
+            return
+        self.etag = weak_etag((
+            parts,
+            self.action,
+            sorted(kwargs.items()),
+            sorted(request.query_params.lists()),
+        ))
+        response = get_conditional_response(request, etag=self.etag)
+        if response is not None:
+            raise ConditionalResponseError(response)
+
+
+class CatalogCacheMixin:
+    """Отдаёт справочник готовыми JSON-байтами из CatalogCache.
+
+    При попадании в кэш не выполняются ни запросы к БД, ни сериализация.
+    """
+
+    catalog_cache = None
+
+    def list(self, request, *args, **kwargs):
+        return self.catalog_response(
+            request,
+            ('list', sorted(request.query_params.lists())),
+            lambda: self.get_serializer(
+                self.filter_queryset(self.get_queryset()), many=True
+            ).data
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.catalog_response(
+            request,
+            ('retrieve', kwargs[self.lookup_url_kwarg or self.lookup_field]),
+            lambda: self.get_serializer(self.get_object()).data
+        )
+
+    def catalog_response(self, request, params, get_data):
+        entry = self.catalog_cache.get(
+            params, lambda: JSONRenderer().render(get_data())
+        )
+        response = HttpResponse(entry.body, content_type='application/json')
+        if not settings.SHARED_CACHE:
+            return response
+        response['Last-Modified'] = http_date(entry.last_modified)
+        return get_conditional_response(
+            request, last_modified=entry.last_modified, response=response
+        )
+
+    def get_etag_parts(self, request):
+        return (self.catalog_cache.version(),)
+
+
+class RecipeResponseCacheMixin:
+    """Кэширует общие ответы списка и детальной страницы рецептов.
+
+    В кэш попадает ответ, построенный для анонимного пользователя.
+    Признаки текущего пользователя (избранное, корзина, подписки)
+    накладываются поверх из небольшого персонального кэша.
+    """
+
+    build_shared_response = False
+
+    def get_viewer(self):
+        if self.build_shared_response:
+            return AnonymousUser()
+        return self.request.user
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            super().retrieve, request, *args, **kwargs
+        )
+
+    def cached_response(self, view, request, *args, **kwargs):
+        if not is_cacheable(request):
+            return view(request, *args, **kwargs)
+        data = recipes_cache.get_value(
+            (
+                self.action,
+                request.build_absolute_uri(request.path),
+                sorted(request.query_params.lists()),
+            ),
+            lambda version: self.build_shared(view, request, *args, **kwargs)
+        )
+        return Response(personalize(data, request.user))
+
+    def build_shared(self, view, request, *args, **kwargs):
+        self.build_shared_response = True
+        try:
+            return view(request, *args, **kwargs).data
+        finally:
+            self.build_shared_response = False
@@ -8,5 +8,5 @@ class AuthorOrAdminOrReadOnly(IsAuthenticatedOrReadOnly):
         return (
             request.method in SAFE_METHODS
             or request.user.is_authenticated
-            and request.user == obj.author
+            and request.user.pk == obj.author_id
         )
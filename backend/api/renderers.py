@@ -0,0 +1,50 @@
+import json
+
+from rest_framework import renderers
+
+from foodgram.metrics import timing
+
+
+class TimedRenderMixin:
+    """Учитывает время рендеринга в метриках запроса."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        with timing('render'):
+            return super().render(data, accepted_media_type, renderer_context)
+
+
+class JSONRenderer(TimedRenderMixin, renderers.JSONRenderer):
+    pass
+
+
+class PlainTextRenderer(TimedRenderMixin, renderers.BaseRenderer):
+    """Рендерер для выгрузки в текстовом формате.
+
+    Сам файл отдаётся потоково, мимо рендерера, поэтому render
+    используется только для ответов с ошибками.
+    """
+
+    media_type = 'text/plain'
+    format = 'txt'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if isinstance(data, str):
+            return data.encode(self.charset)
+        return json.dumps(data, ensure_ascii=False).encode(self.charset)
+
+
+class CSVRenderer(PlainTextRenderer):
+    """Рендерер для выгрузки в формате CSV."""
+
+    media_type = 'text/csv'
+    format = 'csv'
+
+
+class PDFRenderer(PlainTextRenderer):
+    """Рендерер для выгрузки в формате PDF."""
+
+    media_type = 'application/pdf'
+    format = 'pdf'
@@ -0,0 +1,87 @@
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .catalog_cache import CatalogCache
+from foodgram.consts import CATALOG_CACHE_TIMEOUT
+from foodgram.db_router import primary_db
+from recipes.models import FavoriteRecipes, ShoppingCart
+from users.models import Follow
+
+UserOverlay = namedtuple(
+    'UserOverlay', ('favorites', 'shopping_cart', 'following', 'version')
+)
+USER_FILTER_PARAMS = ('is_favorited', 'is_in_shopping_cart')
+
+
+def is_cacheable(request):
+    """Общий кэш не подходит для выборок, зависящих от пользователя."""
+    return not any(
+        param in request.query_params for param in USER_FILTER_PARAMS
+    )
+
+
+def overlay_key(user_id):
+    return f'recipes:overlay:{user_id}'
+
+
+def get_overlay(user):
+    """Множества id избранного, корзины и авторов в подписках."""
+    if not settings.SHARED_CACHE:
+        return build_overlay(user)
+    key = overlay_key(user.id)
+    overlay = cache.get(key)
+    if overlay is None:
+        with primary_db():
+            overlay = build_overlay(user)
+        cache.set(key, overlay, timeout=CATALOG_CACHE_TIMEOUT)
+    return overlay
+
+
+def build_overlay(user):
+    """Собирает UserOverlay запросами к базе."""
+    return UserOverlay(
+        favorites=set(FavoriteRecipes.objects.filter(
+            user=user
+        ).values_list('recipe_id', flat=True)),
+        shopping_cart=set(ShoppingCart.objects.filter(
+            user=user
+        ).values_list('recipe_id', flat=True)),
+        following=set(Follow.objects.filter(
+            user=user
+        ).values_list('author_id', flat=True)),
+        version=CatalogCache.new_version(),
+    )
+
+
+def invalidate_overlay(user_id):
+    transaction.on_commit(lambda: cache.delete(overlay_key(user_id)))
+
+
+def apply_overlay(recipe, overlay):
+    return {
+        **recipe,
+        'author': {
+            **recipe['author'],
+            'is_subscribed': recipe['author']['id'] in overlay.following,
+        },
+        'is_favorited': recipe['id'] in overlay.favorites,
+        'is_in_shopping_cart': recipe['id'] in overlay.shopping_cart,
+    }
+
+
+def personalize(data, user):
+    """Накладывает признаки пользователя на общий анонимный ответ."""
+    if not user.is_authenticated:
+        return data
+    overlay = get_overlay(user)
+    if 'results' not in data:
+        return apply_overlay(data, overlay)
+    return {
+        **data,
+        'results': [
+            apply_overlay(recipe, overlay) for recipe in data['results']
+        ],
+    }
@@ -0,0 +1,216 @@
+import re
+import threading
+from bisect import bisect_left
+from collections import defaultdict
+from difflib import SequenceMatcher
+
+from django.contrib.postgres.search import (SearchQuery, SearchRank,
+                                            TrigramSimilarity)
+from django.db import connections
+from django.db.models import (BooleanField, Case, F, Func, IntegerField, Q,
+                              Value, When)
+from django.db.models.functions import Upper
+
+from .catalog_cache import ingredients_cache
+from foodgram.consts import INGREDIENT_SEARCH_LIMIT, RECIPE_SEARCH_CONFIG
+from recipes.models import Ingredient, Recipe
+from recipes.search import FTS_TABLE
+
+PREFIX, SUBSTRING, TYPO = range(3)
+TYPO_MIN_RATIO = 0.75
+
+
+class TrigramMatch(Func):
+    """Оператор pg_trgm `%`, который обслуживается GIN-индексом."""
+
+    arg_joiner = ' %% '
+    template = '(%(expressions)s)'
+    output_field = BooleanField()
+
+
+def trigrams(text):
+    """Триграммы строки, дополненной пробелами в начале, как в pg_trgm."""
+    padded = f'  {text}'
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class MemoryIngredientIndex:
+    """Отсортированный массив названий для поиска без pg_trgm.
+
+    Рядом хранится обратный индекс триграмм: подстроки и опечатки
+    ищутся только среди названий с общими с запросом триграммами,
+    а не по всему справочнику. Перестраивается при смене версии
+    справочника ингредиентов.
+    """
+
+    def __init__(self):
+        self._version = None
+        self._index = ([], [], {})
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        version = ingredients_cache.version()
+        if version == self._version:
+            return
+        with self._lock:
+            entries = sorted(
+                (name.lower(), pk)
+                for pk, name in Ingredient.objects.values_list('id', 'name')
+            )
+            postings = defaultdict(list)
+            for position, (key, _) in enumerate(entries):
+                for trigram in trigrams(f'{key} '):
+                    postings[trigram].append(position)
+            self._index = (
+                [key for key, _ in entries],
+                [pk for _, pk in entries],
+                dict(postings),
+            )
+            self._version = version
+
+    @staticmethod
+    def substring_candidates(keys, postings, query):
+        """Названия, в которых есть все триграммы запроса.
+
+        Запрос короче трёх символов проверяется по всем названиям.
+        """
+        if len(query) < 3:
+            return range(len(keys))
+        positions = None
+        for i in range(len(query) - 2):
+            posting = postings.get(query[i:i + 3], ())
+            if positions is None:
+                positions = set(posting)
+            else:
+                positions.intersection_update(posting)
+        return sorted(positions)
+
+    @staticmethod
+    def typo_candidates(postings, query):
+        """Названия, у которых есть общие с запросом триграммы."""
+        positions = set()
+        for trigram in trigrams(query):
+            positions.update(postings.get(trigram, ()))
+        return positions
+
+    def search(self, query, limit):
+        self.refresh()
+        keys, ids, postings = self._index
+        query = query.lower()
+        found = []
+        position = bisect_left(keys, query)
+        while (position < len(keys) and len(found) < limit
+               and keys[position].startswith(query)):
+            found.append(ids[position])
+            position += 1
+        for position in self.substring_candidates(keys, postings, query):
+            if len(found) >= limit:
+                return found
+            key = keys[position]
+            if query in key and not key.startswith(query):
+                found.append(ids[position])
+        typos = []
+        matcher = SequenceMatcher()
+        matcher.set_seq2(query)
+        for position in self.typo_candidates(postings, query):
+            key = keys[position]
+            if query in key:
+                continue
+            matcher.set_seq1(key[:len(query)])
+            if (matcher.real_quick_ratio() >= TYPO_MIN_RATIO
+                    and matcher.quick_ratio() >= TYPO_MIN_RATIO):
+                ratio = matcher.ratio()
+                if ratio >= TYPO_MIN_RATIO:
+                    typos.append((-ratio, key, ids[position]))
+        found.extend(pk for _, _, pk in sorted(typos)[:limit - len(found)])
+        return found
+
+
+class IngredientSearch:
+    """Поиск ингредиентов по названию.
+
+    Сначала совпадения по началу названия, затем по подстроке,
+    затем похожие (опечатки). Количество результатов ограничено.
+    На PostgreSQL используется GIN-индекс pg_trgm, на остальных
+    базах - MemoryIngredientIndex.
+    """
+
+    def __init__(self, limit=INGREDIENT_SEARCH_LIMIT):
+        self.limit = limit
+        self.memory_index = MemoryIngredientIndex()
+
+    def search(self, queryset, query):
+        if connections[queryset.db].vendor == 'postgresql':
+            return self.search_postgresql(queryset, query)
+        return self.search_memory(queryset, query)
+
+    def search_postgresql(self, queryset, query):
+        upper_name, upper_query = Upper('name'), Upper(Value(query))
+        return queryset.annotate(
+            search_rank=Case(
+                When(name__istartswith=query, then=Value(PREFIX)),
+                When(name__icontains=query, then=Value(SUBSTRING)),
+                default=Value(TYPO),
+                output_field=IntegerField(),
+            ),
+            similarity=TrigramSimilarity(upper_name, upper_query),
+        ).filter(
+            Q(name__icontains=query) | Q(TrigramMatch(upper_name, upper_query))
+        ).order_by('search_rank', '-similarity', 'name')[:self.limit]
+
+    def search_memory(self, queryset, query):
+        ids = self.memory_index.search(query, self.limit)
+        if not ids:
+            return queryset.none()
+        return queryset.filter(pk__in=ids).order_by(Case(
+            *[When(pk=pk, then=Value(position))
+              for position, pk in enumerate(ids)],
+            output_field=IntegerField(),
+        ))
+
+
+class RecipeSearch:
+    """Полнотекстовый поиск рецептов по названию, ингредиентам и описанию.
+
+    Рецепты отбираются по индексу recipes.search и упорядочиваются
+    по релевантности, затем по дате публикации. На PostgreSQL это
+    search_vector с GIN-индексом, на SQLite - таблица FTS5, в которой
+    каждое слово запроса ищется по началу. С ?cursor= совпадения
+    идут по дате: keyset-пагинация не учитывает релевантность.
+    """
+
+    ordering = ('-search_rank', '-pub_date', '-id')
+
+    def search(self, queryset, query):
+        if connections[queryset.db].vendor == 'postgresql':
+            return self.search_postgresql(queryset, query)
+        return self.search_sqlite(queryset, query)
+
+    def search_postgresql(self, queryset, query):
+        search_query = SearchQuery(
+            query, config=RECIPE_SEARCH_CONFIG, search_type='websearch'
+        )
+        return queryset.filter(search_vector=search_query).annotate(
+            search_rank=SearchRank(F('search_vector'), search_query)
+        ).order_by(*self.ordering)
+
+    def search_sqlite(self, queryset, query):
+        words = re.findall(
+            r'\w+', query.replace('ё', 'е').replace('Ё', 'Е')
+        )
+        if not words:
+            return queryset.none()
+        match = ' '.join(f'"{word}"*' for word in words)
+        return queryset.extra(
+            tables=(FTS_TABLE,),
+            where=(
+                f'{FTS_TABLE} MATCH %s',
+                f'{FTS_TABLE}.rowid = {Recipe._meta.db_table}.id',
+            ),
+            params=(match,),
+            select={'search_rank': f'-{FTS_TABLE}.rank'},
+        ).order_by(*self.ordering)
+
+
+ingredient_search = IngredientSearch()
+recipe_search = RecipeSearch()
@@ -1,16 +1,44 @@
+from django.apps import apps
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import transaction
 from djoser.serializers import UserSerializer
 from drf_extra_fields.fields import Base64ImageField
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
 from rest_framework.validators import UniqueTogetherValidator
 
+from .authentication import sign_token
+from foodgram.metrics import timing
+from recipes.images import image_pipeline
 from recipes.models import (FavoriteRecipes, Ingredient,
                             IngredientInRecipes, Recipe,
-                            ShoppingCart, Tag)
+                            ShoppingCart, ShoppingListItem, Tag)
+from recipes.search import index_recipes
+from recipes.shopping_list import change_recipe
 from users.models import User, Follow
 
 
-class UserSerializer(UserSerializer):
+class TimedRepresentationMixin:
+    """Учитывает время сериализации в метриках запроса."""
+
+    def to_representation(self, instance):
+        with timing('serialize'):
+            return super().to_representation(instance)
+
+
+class TokenSerializer(serializers.Serializer):
+    """Токен для входа: ключ DRF или подписанный токен."""
+
+    auth_token = serializers.SerializerMethodField()
+
+    def get_auth_token(self, token):
+        if settings.AUTH_TOKEN['SIGNED']:
+            return sign_token(token)
+        return token.key
+
+
+class UserSerializer(TimedRepresentationMixin, UserSerializer):
     """Сериализатор для пользователей."""
     is_subscribed = serializers.SerializerMethodField(read_only=True)
 
@@ -26,6 +54,8 @@ class UserSerializer(UserSerializer):
         )
 
     def get_is_subscribed(self, obj):
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
         request = self.context.get('request')
         return (request and request.user.is_authenticated
                 and obj.following.filter(user=request.user).exists())
@@ -43,17 +73,14 @@ class FollowerSerializer(UserSerializer):
         read_only_fields = ('email', 'username', 'first_name', 'last_name')
 
     def get_recipes(self, obj):
-        request = self.context.get('request')
-        if not request:
-            return False
-        limit = request.GET.get('recipes_limit')
+        limit = self.context.get('recipes_limit')
         queryset = obj.recipes.all()
         if limit:
-            queryset = queryset[: int(limit)]
+            queryset = queryset[:limit]
         return RecipeShortSerializer(queryset, many=True).data
 
     def get_recipes_count(self, obj):
-        return obj.recipes.count()
+        return obj.recipes_count
 
 
 class UserSubscribeSerializer(serializers.ModelSerializer):
@@ -71,7 +98,8 @@ class UserSubscribeSerializer(serializers.ModelSerializer):
         ]
 
 
-class TagSerializer(serializers.ModelSerializer):
+class TagSerializer(TimedRepresentationMixin,
+                    serializers.ModelSerializer):
     """Сериализатор для тегов."""
 
     class Meta:
@@ -79,7 +107,8 @@ class TagSerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'color', 'slug',)
 
 
-class IngredientSerializer(serializers.ModelSerializer):
+class IngredientSerializer(TimedRepresentationMixin,
+                           serializers.ModelSerializer):
     """Сериализатор для ингридиентов."""
 
     class Meta:
@@ -106,9 +135,7 @@ class IngredientInRecipeSerializer(serializers.ModelSerializer):
 class CreateIngredientInRecipeSerializer(serializers.ModelSerializer):
     """Сериализатор для cоздания ингридиентов в рецептах."""
 
-    id = serializers.PrimaryKeyRelatedField(
-        queryset=Ingredient.objects.all()
-    )
+    id = serializers.IntegerField()
     amount = serializers.IntegerField(write_only=True, min_value=1)
 
     class Meta:
@@ -123,14 +150,54 @@ class CreateIngredientInRecipeSerializer(serializers.ModelSerializer):
         return value
 
 
-class RecipeShortSerializer(serializers.ModelSerializer):
+class ImageRenditionsField(serializers.ReadOnlyField):
+    """Ссылки на оригинал фото и его уменьшенные копии."""
+
+    def __init__(self, **kwargs):
+        kwargs['source'] = '*'
+        super().__init__(**kwargs)
+
+    def get_url(self, name):
+        url = default_storage.url(name)
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
+
+    def to_representation(self, recipe):
+        if not recipe.image:
+            return {}
+        images = {'original': self.get_url(recipe.image.name)}
+        if recipe.image_renditions.get('source') != recipe.image.name:
+            return images
+        for rendition, formats in recipe.image_renditions[
+            'renditions'
+        ].items():
+            images[rendition] = {
+                extension: self.get_url(name)
+                for extension, name in formats.items()
+            }
+        return images
+
+
+class RecipeShortSerializer(TimedRepresentationMixin,
+                            serializers.ModelSerializer):
+    images = ImageRenditionsField()
 
     class Meta:
         model = Recipe
-        fields = ('id', 'name', 'image', 'cooking_time')
+        fields = ('id', 'name', 'image', 'images', 'cooking_time')
+
+
+class SimilarRecipeSerializer(RecipeShortSerializer):
+    """Похожий рецепт со степенью сходства."""
+
+    score = serializers.FloatField(read_only=True)
+
+    class Meta(RecipeShortSerializer.Meta):
+        fields = RecipeShortSerializer.Meta.fields + ('score',)
 
 
-class RecipeReadSerializer(serializers.ModelSerializer):
+class RecipeReadSerializer(TimedRepresentationMixin,
+                           serializers.ModelSerializer):
     """Сериалитзатор для просмотра рецептов."""
 
     author = UserSerializer(read_only=True, many=False)
@@ -147,6 +214,7 @@ class RecipeReadSerializer(serializers.ModelSerializer):
         read_only=True
     )
     image = Base64ImageField(max_length=None)
+    images = ImageRenditionsField()
 
     class Meta:
         model = Recipe
@@ -159,16 +227,21 @@ class RecipeReadSerializer(serializers.ModelSerializer):
             'is_in_shopping_cart',
             'name',
             'image',
+            'images',
             'text',
             'cooking_time'
         )
 
     def get_is_favorited(self, obj):
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
         request = self.context.get('request')
         return (request and request.user.is_authenticated
                 and obj.favorites.filter(user=request.user).exists())
 
     def get_is_in_shopping_cart(self, obj):
+        if hasattr(obj, 'is_in_shopping_cart'):
+            return obj.is_in_shopping_cart
         request = self.context.get('request')
         return (request and request.user.is_authenticated
                 and obj.shopping_cart.filter(user=request.user).exists())
@@ -198,6 +271,20 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
             'cooking_time'
         )
 
+    def validate_ingredients(self, ingredients):
+        """Заменяет id ингредиентов объектами одним запросом."""
+        found = Ingredient.objects.in_bulk(
+            {ingredient['id'] for ingredient in ingredients}
+        )
+        for ingredient in ingredients:
+            if ingredient['id'] not in found:
+                raise ValidationError(
+                    f'Недопустимый первичный ключ "{ingredient["id"]}" - '
+                    'объект не существует.'
+                )
+            ingredient['id'] = found[ingredient['id']]
+        return ingredients
+
     @staticmethod
     def create_ingredients(ingredients, recipe):
         IngredientInRecipes.objects.bulk_create(
@@ -211,6 +298,7 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
             ]
         )
 
+    @transaction.atomic
     def create(self, validated_data):
         request = self.context.get('request')
         tags = validated_data.pop('tags')
@@ -218,19 +306,73 @@ class RecipeWriteSerializer(serializers.ModelSerializer):
         recipe = Recipe.objects.create(author=request.user, **validated_data)
         recipe.tags.set(tags)
         self.create_ingredients(ingredients=ingredients, recipe=recipe)
+        index_recipes(apps, [recipe.pk])
+        image_pipeline.schedule(recipe)
         return recipe
 
+    @staticmethod
+    def update_ingredients(ingredients, recipe):
+        amounts = {
+            ingredient['id'].id: ingredient['amount']
+            for ingredient in ingredients
+        }
+        current = {
+            row.ingredient_id: row
+            for row in IngredientInRecipes.objects.filter(recipe=recipe)
+        }
+        deltas = {
+            ingredient_id: amounts.get(ingredient_id, 0) - (
+                current[ingredient_id].amount if ingredient_id in current
+                else 0
+            )
+            for ingredient_id in current.keys() | amounts.keys()
+        }
+        IngredientInRecipes.objects.filter(
+            recipe=recipe,
+            ingredient_id__in=current.keys() - amounts.keys()
+        ).delete()
+        changed = []
+        for ingredient_id, row in current.items():
+            amount = amounts.get(ingredient_id)
+            if amount is not None and row.amount != amount:
+                row.amount = amount
+                changed.append(row)
+        IngredientInRecipes.objects.bulk_update(changed, ('amount',))
+        IngredientInRecipes.objects.bulk_create(
+            [
+                IngredientInRecipes(
+                    ingredient_id=ingredient_id,
+                    recipe=recipe,
+                    amount=amount,
+                )
+                for ingredient_id, amount in amounts.items()
+                if ingredient_id not in current
+            ]
+        )
+        change_recipe(apps, recipe.pk, deltas)
+
+    @transaction.atomic
     def update(self, instance, validated_data):
-        instance.tags.clear()
-        IngredientInRecipes.objects.filter(recipe=instance).delete()
-        instance.tags.set(validated_data.pop('tags'))
-        ingredients = validated_data.pop('ingredients')
-        self.create_ingredients(ingredients=ingredients, recipe=instance)
+        if validated_data.keys() & {'tags', 'ingredients'}:
+            instance.similar_stale = True
+        if 'tags' in validated_data:
+            instance.tags.set(validated_data.pop('tags'))
+        if 'ingredients' in validated_data:
+            self.update_ingredients(
+                ingredients=validated_data.pop('ingredients'),
+                recipe=instance
+            )
+        if validated_data.get('image'):
+            image_pipeline.schedule(instance)
         return super().update(instance, validated_data)
 
     def to_representation(self, instance):
+        request = self.context.get('request')
+        instance = Recipe.objects.with_user_flags(
+            request.user
+        ).with_related(request.user).get(pk=instance.pk)
         return RecipeReadSerializer(instance, context={
-            'request': self.context.get('request')
+            'request': request
         }).data
 
 
@@ -270,3 +412,17 @@ class ShoppingCartSerializer(serializers.ModelSerializer):
         request = self.context.get('request')
         context = {'request': request}
         return RecipeShortSerializer(instance.recipe, context=context).data
+
+
+class ShoppingListItemSerializer(serializers.ModelSerializer):
+    """Сериализатор для суммарного списка покупок."""
+
+    id = serializers.ReadOnlyField(source='ingredient.id')
+    name = serializers.ReadOnlyField(source='ingredient.name')
+    measurement_unit = serializers.ReadOnlyField(
+        source='ingredient.measurement_unit'
+    )
+
+    class Meta:
+        model = ShoppingListItem
+        fields = ('id', 'name', 'measurement_unit', 'amount',)
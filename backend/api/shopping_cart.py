@@ -0,0 +1,114 @@
+import csv
+import json
+from io import BytesIO
+
+from django.conf import settings
+from django.http import FileResponse, StreamingHttpResponse
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen.canvas import Canvas
+
+SHOPPING_CART_TITLE = 'Список покупок'
+CSV_HEADER = ('Ингредиент', 'Количество', 'Единица измерения')
+PDF_FONT_NAME = 'ShoppingCartFont'
+PDF_MARGIN = 50
+PDF_LINE_HEIGHT = 18
+
+
+class Echo:
+    """Псевдобуфер для csv.writer: возвращает строку вместо записи."""
+
+    def write(self, value):
+        return value
+
+
+def format_line(ingredient):
+    return (
+        f'{ingredient["ingredient__name"]}: '
+        f'{ingredient["total_amount"]} '
+        f'{ingredient["ingredient__measurement_unit"]}'
+    )
+
+
+def txt_content(ingredients):
+    yield f'{SHOPPING_CART_TITLE}\n'
+    for ingredient in ingredients:
+        yield f'{format_line(ingredient)}\n'
+
+
+def csv_content(ingredients):
+    writer = csv.writer(Echo())
+    yield writer.writerow(CSV_HEADER)
+    for ingredient in ingredients:
+        yield writer.writerow((
+            ingredient['ingredient__name'],
+            ingredient['total_amount'],
+            ingredient['ingredient__measurement_unit'],
+        ))
+
+
+def json_content(ingredients):
+    separator = ''
+    yield '['
+    for ingredient in ingredients:
+        yield separator + json.dumps({
+            'name': ingredient['ingredient__name'],
+            'measurement_unit': ingredient['ingredient__measurement_unit'],
+            'amount': ingredient['total_amount'],
+        }, ensure_ascii=False)
+        separator = ','
+    yield ']'
+
+
+def pdf_content(ingredients):
+    """PDF собирается целиком: формат требует таблицы смещений в конце."""
+    if PDF_FONT_NAME not in pdfmetrics.getRegisteredFontNames():
+        pdfmetrics.registerFont(
+            TTFont(PDF_FONT_NAME, settings.SHOPPING_CART_PDF_FONT)
+        )
+    buffer = BytesIO()
+    canvas = Canvas(buffer, pagesize=A4)
+    _, height = A4
+    top = height - PDF_MARGIN
+    canvas.setFont(PDF_FONT_NAME, 14)
+    canvas.drawString(PDF_MARGIN, top, SHOPPING_CART_TITLE)
+    canvas.setFont(PDF_FONT_NAME, 11)
+    position = top - PDF_LINE_HEIGHT * 2
+    for ingredient in ingredients:
+        if position < PDF_MARGIN:
+            canvas.showPage()
+            canvas.setFont(PDF_FONT_NAME, 11)
+            position = top
+        canvas.drawString(PDF_MARGIN, position, format_line(ingredient))
+        position -= PDF_LINE_HEIGHT
+    canvas.save()
+    buffer.seek(0)
+    return buffer
+
+
+STREAMING_CONTENT = {
+    'txt': txt_content,
+    'csv': csv_content,
+    'json': json_content,
+}
+
+
+def shopping_cart_response(ingredients, user, renderer):
+    """Отдаёт список покупок в формате, выбранном content negotiation."""
+    filename = f'{user.username}_shopping_cart.{renderer.format}'
+    if renderer.format == 'pdf':
+        return FileResponse(
+            pdf_content(ingredients),
+            as_attachment=True,
+            filename=filename,
+            content_type=renderer.media_type,
+        )
+    response = StreamingHttpResponse(
+        STREAMING_CONTENT[renderer.format](ingredients),
+        content_type=(
+            f'{renderer.media_type}; charset={renderer.charset or "utf-8"}'
+        ),
+    )
+    response['Content-Disposition'] = f'attachment; filename={filename}'
+    return response
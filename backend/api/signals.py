@@ -0,0 +1,61 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from .authentication import invalidate_token, invalidate_user
+from .catalog_cache import (ingredients_cache, recipes_cache, tags_cache,
+                            users_cache)
+from .response_cache import invalidate_overlay
+from recipes.images import renditions_ready
+from recipes.models import (FavoriteRecipes, Ingredient, Recipe,
+                            ShoppingCart, Tag)
+from users.models import Follow, User
+
+
+@receiver((post_save, post_delete), sender=Tag)
+def invalidate_tags_cache(**kwargs):
+    transaction.on_commit(tags_cache.bump)
+    transaction.on_commit(recipes_cache.bump)
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def invalidate_ingredients_cache(**kwargs):
+    transaction.on_commit(ingredients_cache.bump)
+    transaction.on_commit(recipes_cache.bump)
+
+
+@receiver((post_save, post_delete), sender=Recipe)
+@receiver(renditions_ready, sender=Recipe)
+def invalidate_recipes_cache(**kwargs):
+    transaction.on_commit(recipes_cache.bump)
+
+
+@receiver(post_save, sender=User)
+def invalidate_users_cache(instance, update_fields, **kwargs):
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
+    token_keys = list(
+        Token.objects.filter(user=instance).values_list('key', flat=True)
+    )
+    transaction.on_commit(lambda: invalidate_user(instance.pk, token_keys))
+    transaction.on_commit(users_cache.bump)
+    transaction.on_commit(recipes_cache.bump)
+
+
+@receiver(post_delete, sender=User)
+def invalidate_users_cache_on_delete(instance, **kwargs):
+    transaction.on_commit(lambda: invalidate_user(instance.pk, ()))
+    transaction.on_commit(users_cache.bump)
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_deleted_token(instance, **kwargs):
+    invalidate_token(instance.key)
+
+
+@receiver((post_save, post_delete), sender=FavoriteRecipes)
+@receiver((post_save, post_delete), sender=ShoppingCart)
+@receiver((post_save, post_delete), sender=Follow)
+def invalidate_user_overlay(instance, **kwargs):
+    invalidate_overlay(instance.user_id)
@@ -0,0 +1,72 @@
+import shutil
+import tempfile
+
+from django.test import override_settings
+from rest_framework.test import APITestCase
+
+from recipes.models import Ingredient, IngredientInRecipes, Recipe, Tag
+from users.models import User
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class FoodgramAPITestCase(APITestCase):
+    """Теги, ингредиенты и фабрики пользователей и рецептов для тестов."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tags = [
+            Tag.objects.create(
+                name=f'Тег {number}', color=f'#00000{number}',
+                slug=f'tag{number}'
+            )
+            for number in range(3)
+        ]
+        cls.ingredients = [
+            Ingredient.objects.create(
+                name=f'Ингредиент {number}', measurement_unit='г'
+            )
+            for number in range(6)
+        ]
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    @staticmethod
+    def create_user(name):
+        return User.objects.create_user(
+            email=f'{name}@example.com',
+            username=name,
+            first_name=name,
+            last_name=name,
+            password='Zq7-mellon-Kettle',
+        )
+
+    def create_recipe(self, author, amounts, name='Рецепт'):
+        """Рецепт с ингредиентами amounts: {номер ингредиента: количество}."""
+        recipe = Recipe.objects.create(
+            author=author,
+            name=name,
+            text='Описание',
+            image='recipes/test.png',
+            cooking_time=10,
+        )
+        recipe.tags.set(self.tags[:1])
+        IngredientInRecipes.objects.bulk_create([
+            IngredientInRecipes(
+                recipe=recipe,
+                ingredient=self.ingredients[number],
+                amount=amount,
+            )
+            for number, amount in amounts.items()
+        ])
+        return recipe
+
+    def ingredients_payload(self, amounts):
+        return [
+            {'id': self.ingredients[number].pk, 'amount': amount}
+            for number, amount in amounts.items()
+        ]
@@ -0,0 +1,73 @@
+from django.core.cache import cache
+from django.test import override_settings
+from rest_framework.authtoken.models import Token
+
+from .base import FoodgramAPITestCase
+
+AUTH_TOKEN = {'CACHE_TIMEOUT': 60, 'SIGNED_MAX_AGE': 60 * 60 * 24}
+
+
+class TokenTestsMixin:
+    """Вход, запросы с токеном и выход через API."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = self.create_user('user')
+
+    def login(self):
+        self.client.credentials()
+        response = self.client.post(
+            '/api/auth/token/login/',
+            {'email': 'user@example.com', 'password': 'Zq7-mellon-Kettle'},
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.data['auth_token']
+
+    def me(self, token):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token}')
+        return self.client.get('/api/users/me/').status_code
+
+    def logout(self, token):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token}')
+        response = self.client.post('/api/auth/token/logout/')
+        self.assertEqual(response.status_code, 204)
+
+    def test_logout_revokes_token(self):
+        token = self.login()
+        self.assertEqual(self.me(token), 200)
+        self.assertEqual(self.me(token), 200)
+        self.logout(token)
+        self.assertEqual(self.me(token), 401)
+
+    def test_inactive_user_rejected(self):
+        token = self.login()
+        self.assertEqual(self.me(token), 200)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_active = False
+            self.user.save()
+        self.assertEqual(self.me(token), 401)
+
+
+@override_settings(SHARED_CACHE=True,
+                   AUTH_TOKEN={**AUTH_TOKEN, 'SIGNED': True})
+class SignedTokenTests(TokenTestsMixin, FoodgramAPITestCase):
+    """Подписанный токен проверяется без БД и отзывается при выходе."""
+
+    def test_tampered_token_rejected(self):
+        token = self.login()
+        self.assertEqual(self.me(token[:-1] + chr(ord(token[-1]) ^ 1)), 401)
+
+    def test_drf_key_rejected(self):
+        self.login()
+        self.assertEqual(self.me(Token.objects.get(user=self.user).key), 401)
+
+    def test_new_login_after_logout(self):
+        token = self.login()
+        self.logout(token)
+        self.assertEqual(self.me(self.login()), 200)
+
+
+@override_settings(SHARED_CACHE=True,
+                   AUTH_TOKEN={**AUTH_TOKEN, 'SIGNED': False})
+class CachedTokenTests(TokenTestsMixin, FoodgramAPITestCase):
+    """Ключ DRF из кэша перестаёт действовать после выхода."""
@@ -0,0 +1,74 @@
+from django.apps import apps
+
+from .base import FoodgramAPITestCase
+from recipes.counters import recount
+from recipes.models import Recipe
+from users.models import User
+
+
+class CounterTests(FoodgramAPITestCase):
+    """Счётчики избранного, рецептов и подписчиков совпадают с пересчётом."""
+
+    def setUp(self):
+        self.author = self.create_user('author')
+        self.fans = [self.create_user(f'fan{number}') for number in range(3)]
+        self.recipes = [
+            self.create_recipe(self.author, {0: 10}, name=f'Рецепт {number}')
+            for number in range(3)
+        ]
+
+    def counters(self):
+        return (
+            dict(Recipe.objects.values_list('pk', 'favorites_count')),
+            dict(User.objects.values_list('pk', 'recipes_count')),
+            dict(User.objects.values_list('pk', 'followers_count')),
+        )
+
+    def assert_counters_consistent(self):
+        maintained = self.counters()
+        recount(apps)
+        self.assertEqual(maintained, self.counters())
+
+    def test_favorites_and_follows(self):
+        for fan in self.fans:
+            self.client.force_authenticate(fan)
+            for recipe in self.recipes[:2]:
+                response = self.client.post(
+                    f'/api/recipes/{recipe.pk}/favorite/'
+                )
+                self.assertEqual(response.status_code, 201)
+            response = self.client.post(
+                f'/api/users/{self.author.pk}/subscribe/'
+            )
+            self.assertEqual(response.status_code, 201)
+        self.client.force_authenticate(self.fans[0])
+        self.client.delete(f'/api/recipes/{self.recipes[0].pk}/favorite/')
+        self.client.delete(f'/api/users/{self.author.pk}/subscribe/')
+        self.assertEqual(
+            Recipe.objects.get(pk=self.recipes[0].pk).favorites_count, 2
+        )
+        self.assertEqual(
+            User.objects.get(pk=self.author.pk).followers_count, 2
+        )
+        self.assert_counters_consistent()
+
+    def test_recipe_delete_with_favorites(self):
+        for fan in self.fans:
+            self.client.force_authenticate(fan)
+            self.client.post(f'/api/recipes/{self.recipes[0].pk}/favorite/')
+            self.client.post(f'/api/recipes/{self.recipes[1].pk}/favorite/')
+        self.client.force_authenticate(self.author)
+        response = self.client.delete(f'/api/recipes/{self.recipes[0].pk}/')
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(
+            User.objects.get(pk=self.author.pk).recipes_count, 2
+        )
+        self.assert_counters_consistent()
+
+    def test_user_delete(self):
+        for fan in self.fans:
+            self.client.force_authenticate(fan)
+            self.client.post(f'/api/recipes/{self.recipes[0].pk}/favorite/')
+            self.client.post(f'/api/users/{self.author.pk}/subscribe/')
+        self.fans[0].delete()
+        self.assert_counters_consistent()
@@ -0,0 +1,95 @@
+from unittest import mock
+
+from django.apps import apps
+
+from .base import FoodgramAPITestCase
+from recipes import feed
+from recipes.models import FeedEntry, Recipe
+
+
+class FeedTests(FoodgramAPITestCase):
+    """Лента подписок: рассылка, дозаполнение и очистка по подпискам."""
+
+    def setUp(self):
+        patcher = mock.patch.object(feed.feed_fanout, 'backend', 'sync')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.reader = self.create_user('reader')
+        self.author = self.create_user('author')
+        self.other = self.create_user('other')
+        self.client.force_authenticate(self.reader)
+
+    def publish(self, author, count):
+        with self.captureOnCommitCallbacks(execute=True):
+            return [
+                self.create_recipe(author, {0: 10}, name=f'Рецепт {number}')
+                for number in range(count)
+            ]
+
+    def subscribe(self, author):
+        response = self.client.post(f'/api/users/{author.pk}/subscribe/')
+        self.assertEqual(response.status_code, 201)
+
+    def walk(self):
+        ids = []
+        url = '/api/recipes/feed/?limit=2'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            data = response.json()
+            ids.extend(recipe['id'] for recipe in data['results'])
+            url = data['next']
+        return ids
+
+    def followed_ids(self):
+        return list(Recipe.objects.filter(
+            author__following__user=self.reader
+        ).order_by('-pub_date', '-id').values_list('pk', flat=True))
+
+    def timeline(self):
+        return set(FeedEntry.objects.filter(
+            user=self.reader
+        ).values_list('recipe_id', flat=True))
+
+    def assert_feed_consistent(self):
+        """Лента совпадает с рецептами подписок и после rebuild()."""
+        ids = self.walk()
+        self.assertEqual(ids, self.followed_ids())
+        feed.rebuild(apps)
+        self.assertEqual(self.walk(), ids)
+        return ids
+
+    def test_fan_out(self):
+        self.subscribe(self.author)
+        recipes = self.publish(self.author, 5)
+        self.publish(self.other, 2)
+        self.assertEqual(self.timeline(), {recipe.pk for recipe in recipes})
+        self.assertEqual(len(self.assert_feed_consistent()), 5)
+
+    def test_backfill_on_subscribe(self):
+        recipes = self.publish(self.author, 5)
+        self.assertEqual(self.timeline(), set())
+        self.subscribe(self.author)
+        self.assertEqual(self.timeline(), {recipe.pk for recipe in recipes})
+        self.assertEqual(len(self.assert_feed_consistent()), 5)
+
+    def test_prune_on_unsubscribe(self):
+        self.subscribe(self.author)
+        self.subscribe(self.other)
+        self.publish(self.author, 3)
+        others = self.publish(self.other, 2)
+        response = self.client.delete(
+            f'/api/users/{self.author.pk}/subscribe/'
+        )
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.timeline(), {recipe.pk for recipe in others})
+        self.assertEqual(len(self.assert_feed_consistent()), 2)
+
+    def test_popular_author_read_on_demand(self):
+        self.subscribe(self.other)
+        self.publish(self.other, 2)
+        with mock.patch.object(feed, 'FEED_FANOUT_LIMIT', 1):
+            self.subscribe(self.author)
+            recipes = self.publish(self.author, 3)
+            self.assertFalse(self.timeline() & {r.pk for r in recipes})
+            self.assertEqual(len(self.assert_feed_consistent()), 5)
@@ -0,0 +1,60 @@
+from django.utils import timezone
+
+from .base import FoodgramAPITestCase
+from recipes.models import Recipe
+
+
+class RecipeCursorTests(FoodgramAPITestCase):
+    """Keyset-пагинация рецептов по (pub_date, id)."""
+
+    def setUp(self):
+        self.author = self.create_user('author')
+        self.client.force_authenticate(self.author)
+        recipes = [
+            self.create_recipe(self.author, {0: 10}, name=f'Рецепт {number}')
+            for number in range(11)
+        ]
+        # Часть рецептов с одинаковой датой: порядок решает id.
+        Recipe.objects.filter(
+            pk__in=[recipe.pk for recipe in recipes[3:8]]
+        ).update(pub_date=timezone.now())
+
+    def walk(self, url):
+        ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            data = response.json()
+            self.assertIsNone(data['previous'])
+            ids.extend(recipe['id'] for recipe in data['results'])
+            url = data['next']
+        return ids
+
+    def ordered_ids(self):
+        return list(Recipe.objects.order_by(
+            '-pub_date', '-id'
+        ).values_list('pk', flat=True))
+
+    def test_pages_cover_all_recipes_in_order(self):
+        self.assertEqual(
+            self.walk('/api/recipes/?cursor=&limit=4'), self.ordered_ids()
+        )
+
+    def test_new_recipe_does_not_shift_pages(self):
+        expected = self.ordered_ids()
+        response = self.client.get('/api/recipes/?cursor=&limit=4')
+        ids = [recipe['id'] for recipe in response.json()['results']]
+        self.create_recipe(self.author, {1: 10}, name='Новый')
+        ids.extend(self.walk(response.json()['next']))
+        self.assertEqual(ids, expected)
+
+    def test_filters_apply_to_every_page(self):
+        tagged = self.ordered_ids()[::2]
+        for recipe in Recipe.objects.filter(pk__in=tagged):
+            recipe.tags.set(self.tags[1:2])
+        url = f'/api/recipes/?cursor=&limit=2&tags={self.tags[1].slug}'
+        self.assertEqual(self.walk(url), tagged)
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/api/recipes/?cursor=not-a-cursor')
+        self.assertEqual(response.status_code, 404)
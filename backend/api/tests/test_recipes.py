@@ -0,0 +1,75 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from .base import FoodgramAPITestCase
+from recipes.models import IngredientInRecipes
+
+
+class RecipeUpdateTests(FoodgramAPITestCase):
+    """PATCH рецепта применяет ингредиенты и теги разницей."""
+
+    def setUp(self):
+        self.author = self.create_user('author')
+        self.client.force_authenticate(self.author)
+        self.recipe = self.create_recipe(self.author, {0: 100, 1: 200, 2: 300})
+
+    def patch(self, amounts, tags):
+        return self.client.patch(
+            f'/api/recipes/{self.recipe.pk}/',
+            {
+                'ingredients': self.ingredients_payload(amounts),
+                'tags': [tag.pk for tag in tags],
+            },
+            format='json',
+        )
+
+    def rows(self):
+        return {
+            row.ingredient_id: row
+            for row in IngredientInRecipes.objects.filter(recipe=self.recipe)
+        }
+
+    def test_ingredients_match_request(self):
+        amounts = {0: 100, 1: 250, 3: 400}
+        response = self.patch(amounts, self.tags[1:])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            {pk: row.amount for pk, row in self.rows().items()},
+            {self.ingredients[number].pk: amount
+             for number, amount in amounts.items()},
+        )
+        self.assertEqual(
+            {item['id']: item['amount']
+             for item in response.json()['ingredients']},
+            {self.ingredients[number].pk: amount
+             for number, amount in amounts.items()},
+        )
+        self.assertEqual(
+            set(self.recipe.tags.values_list('pk', flat=True)),
+            {tag.pk for tag in self.tags[1:]},
+        )
+
+    def test_unchanged_rows_are_kept(self):
+        before = self.rows()
+        self.patch({0: 100, 1: 250, 3: 400}, self.tags[:1])
+        after = self.rows()
+        kept = self.ingredients[0].pk
+        changed = self.ingredients[1].pk
+        self.assertEqual(after[kept].pk, before[kept].pk)
+        self.assertEqual(after[changed].pk, before[changed].pk)
+        self.assertNotIn(self.ingredients[2].pk, after)
+
+    def test_same_ingredients_write_nothing(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.patch({0: 100, 1: 200, 2: 300}, self.tags[:1])
+        self.assertEqual(response.status_code, 200)
+        table = f'"{IngredientInRecipes._meta.db_table}"'
+        writes = (f'INSERT INTO {table}', f'UPDATE {table}',
+                  f'DELETE FROM {table}')
+        self.assertEqual(
+            [
+                query['sql'] for query in queries.captured_queries
+                if query['sql'].startswith(writes)
+            ],
+            [],
+        )
@@ -0,0 +1,102 @@
+from django.apps import apps
+
+from .base import FoodgramAPITestCase
+from recipes import shopping_list
+from recipes.models import ShoppingListItem
+
+
+class ShoppingListTests(FoodgramAPITestCase):
+    """Списки покупок, обновляемые по шагам, совпадают с rebuild()."""
+
+    def setUp(self):
+        self.author = self.create_user('author')
+        self.buyers = [self.create_user(f'buyer{number}') for number in (0, 1)]
+        self.soup = self.create_recipe(self.author, {0: 100, 1: 50}, 'Суп')
+        self.salad = self.create_recipe(self.author, {1: 30, 2: 20}, 'Салат')
+
+    @staticmethod
+    def snapshot():
+        return set(ShoppingListItem.objects.values_list(
+            'user_id', 'ingredient_id', 'amount'
+        ))
+
+    def assert_matches_rebuild(self):
+        incremental = self.snapshot()
+        shopping_list.rebuild(apps)
+        self.assertEqual(incremental, self.snapshot())
+        return incremental
+
+    def add_to_cart(self, user, recipe):
+        self.client.force_authenticate(user)
+        response = self.client.post(
+            f'/api/recipes/{recipe.pk}/shopping_cart/'
+        )
+        self.assertEqual(response.status_code, 201)
+
+    def fill_carts(self):
+        for buyer in self.buyers:
+            self.add_to_cart(buyer, self.soup)
+        self.add_to_cart(self.buyers[0], self.salad)
+
+    def test_add_to_cart(self):
+        self.fill_carts()
+        buyer = self.buyers[0]
+        self.assertEqual(
+            {
+                item['name']: item['amount']
+                for item in self.client.get(
+                    '/api/recipes/shopping_cart_summary/'
+                ).data
+            },
+            {'Ингредиент 0': 100, 'Ингредиент 1': 80, 'Ингредиент 2': 20},
+        )
+        self.assertIn(
+            (buyer.pk, self.ingredients[1].pk, 80),
+            self.assert_matches_rebuild(),
+        )
+
+    def test_update_recipe_ingredients(self):
+        self.fill_carts()
+        self.client.force_authenticate(self.author)
+        response = self.client.patch(
+            f'/api/recipes/{self.soup.pk}/',
+            {
+                'ingredients': self.ingredients_payload({1: 70, 3: 10}),
+                'tags': [self.tags[0].pk],
+            },
+            format='json',
+        )
+        self.assertEqual(response.status_code, 200)
+        items = self.assert_matches_rebuild()
+        self.assertNotIn(
+            self.ingredients[0].pk,
+            {ingredient_id for _, ingredient_id, _ in items},
+        )
+
+    def test_remove_from_cart(self):
+        self.fill_carts()
+        buyer = self.buyers[0]
+        self.client.force_authenticate(buyer)
+        response = self.client.delete(
+            f'/api/recipes/{self.salad.pk}/shopping_cart/'
+        )
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(
+            {
+                (ingredient_id, amount)
+                for user_id, ingredient_id, amount
+                in self.assert_matches_rebuild()
+                if user_id == buyer.pk
+            },
+            {(self.ingredients[0].pk, 100), (self.ingredients[1].pk, 50)},
+        )
+
+    def test_delete_recipe(self):
+        self.fill_carts()
+        self.client.force_authenticate(self.author)
+        response = self.client.delete(f'/api/recipes/{self.soup.pk}/')
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(
+            {user_id for user_id, _, _ in self.assert_matches_rebuild()},
+            {self.buyers[0].pk},
+        )
@@ -1,7 +1,9 @@
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
-from .views import IngredientViewSet, RecipeViewSet, TagViewSet, UserViewSet
+from .async_views import with_async_reads
+from .views import (CacheStatsView, IngredientViewSet, RecipeViewSet,
+                    TagViewSet, UserViewSet)
 
 app_name = 'api'
 
@@ -12,7 +14,8 @@ v1_router.register('recipes', RecipeViewSet, basename='recipes')
 v1_router.register('users', UserViewSet, basename='users')
 
 urlpatterns = [
-    path('', include(v1_router.urls)),
+    path('cache-stats/', CacheStatsView.as_view(), name='cache-stats'),
+    path('', include(with_async_reads(v1_router.urls))),
     path('', include('djoser.urls')),
     path('auth/', include('djoser.urls.authtoken')),
 ]
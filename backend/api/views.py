@@ -1,33 +1,57 @@
-from django.db.models import Sum
-from django.http import HttpResponse
+from django.db.models import F, OuterRef, Prefetch, Subquery
+from django.http import Http404
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.views import UserViewSet as DjoserUserViewSet
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
-from rest_framework.permissions import SAFE_METHODS, IsAuthenticated
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import (SAFE_METHODS, IsAdminUser,
+                                        IsAuthenticated)
 from rest_framework.response import Response
+from rest_framework.views import APIView
 
+from .catalog_cache import (CatalogCache, ingredients_cache, recipes_cache,
+                            tags_cache, users_cache)
 from .filters import IngredientFilter, RecipeFilter
-from .pagination import CustomPagination
+from .mixins import (CatalogCacheMixin, ConditionalGetMixin,
+                     RecipeResponseCacheMixin, ReplicaReadMixin)
+from .pagination import CustomPagination, FeedPagination, RecipePagination
 from .permissions import AuthorOrAdminOrReadOnly
+from .renderers import (CSVRenderer, JSONRenderer, PDFRenderer,
+                        PlainTextRenderer)
+from .response_cache import get_overlay
 from .serializers import (FavoriteRecipeSerializer, FollowerSerializer,
                           IngredientSerializer, RecipeReadSerializer,
                           RecipeWriteSerializer, ShoppingCartSerializer,
+                          ShoppingListItemSerializer, SimilarRecipeSerializer,
                           TagSerializer, UserSerializer,
                           UserSubscribeSerializer)
-from recipes.models import (FavoriteRecipes, Ingredient,
-                            IngredientInRecipes, Recipe,
-                            ShoppingCart, Tag)
+from .shopping_cart import shopping_cart_response
+from foodgram.consts import SIMILAR_RECIPES_LIMIT
+from recipes.models import (FavoriteRecipes, Ingredient, Recipe,
+                            ShoppingCart, ShoppingListItem, Tag)
 from users.models import Follow, User
 
 
-class UserViewSet(DjoserUserViewSet):
+class UserViewSet(ReplicaReadMixin, ConditionalGetMixin, DjoserUserViewSet):
     """Вьюсет для пользователей."""
 
     queryset = User.objects.all()
     serializer_class = UserSerializer
     pagination_class = CustomPagination
+    conditional_actions = ('list', 'retrieve', 'me', 'subscriptions')
+
+    def get_etag_parts(self, request):
+        user = request.user
+        return (
+            users_cache.version(),
+            self.action == 'subscriptions' and recipes_cache.version(),
+            user.is_authenticated and (user.id, get_overlay(user).version),
+        )
+
+    def get_queryset(self):
+        return super().get_queryset().with_is_subscribed(self.request.user)
 
     @action(
         detail=True,
@@ -58,25 +82,55 @@ class UserViewSet(DjoserUserViewSet):
              permission_classes=[IsAuthenticated])
     def subscriptions(self, request):
         user = request.user
-        queryset = User.objects.filter(following__user=user)
+        limit = self.get_recipes_limit(request)
+        recipes = Recipe.objects.all()
+        if limit:
+            recipes = recipes.filter(pk__in=Subquery(
+                Recipe.objects.filter(
+                    author=OuterRef('author')
+                ).values('pk')[:limit]
+            ))
+        queryset = User.objects.filter(
+            following__user=user
+        ).with_is_subscribed(user).prefetch_related(
+            Prefetch('recipes', queryset=recipes)
+        ).order_by('username')
         page = self.paginate_queryset(queryset)
         serializer = FollowerSerializer(
             page,
             many=True,
-            context={'request': request}
+            context={'request': request, 'recipes_limit': limit}
         )
         return self.get_paginated_response(serializer.data)
 
+    @staticmethod
+    def get_recipes_limit(request):
+        limit = request.query_params.get('recipes_limit')
+        if limit is None:
+            return None
+        try:
+            limit = int(limit)
+        except ValueError:
+            limit = 0
+        if limit < 1:
+            raise ValidationError(
+                {'recipes_limit': 'Должно быть целым положительным числом'}
+            )
+        return limit
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
+
+class TagViewSet(ReplicaReadMixin, CatalogCacheMixin, ConditionalGetMixin,
+                 viewsets.ReadOnlyModelViewSet):
     """Вьюсет для тегов."""
 
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     pagination_class = None
+    catalog_cache = tags_cache
 
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
+class IngredientViewSet(ReplicaReadMixin, CatalogCacheMixin,
+                        ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
     """"Вьюсет для ингридиентов."""
 
     queryset = Ingredient.objects.all()
@@ -85,18 +139,34 @@ class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
     filter_backends = (IngredientFilter, )
     search_fields = ('^name', )
     pagination_class = None
+    catalog_cache = ingredients_cache
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(ReplicaReadMixin, ConditionalGetMixin,
+                    RecipeResponseCacheMixin, viewsets.ModelViewSet):
     """Вьюсет для рецептов."""
 
     queryset = Recipe.objects.all()
     permission_classes = (AuthorOrAdminOrReadOnly, )
     serializer_class = RecipeWriteSerializer
-    pagination_class = CustomPagination
+    pagination_class = RecipePagination
     filter_backends = (DjangoFilterBackend, )
     filterset_class = RecipeFilter
 
+    def get_etag_parts(self, request):
+        user = request.user
+        return (
+            recipes_cache.version(),
+            user.is_authenticated and (user.id, get_overlay(user).version),
+        )
+
+    def get_queryset(self):
+        user = self.get_viewer()
+        queryset = Recipe.objects.with_user_flags(user)
+        if self.request.method in SAFE_METHODS:
+            return queryset.with_related(user).defer('search_vector')
+        return queryset
+
     def get_serializer_class(self):
         if self.request.method in SAFE_METHODS:
             return RecipeReadSerializer
@@ -155,33 +225,77 @@ class RecipeViewSet(viewsets.ModelViewSet):
         return Response(status=status.HTTP_204_NO_CONTENT)
 
     @staticmethod
-    def get_shopping_cart(ingredients, user):
-        filename = f'{user.username}_shopping_cart.txt'
-        shopping_cart = ('Список покупок\n')
-        for ingredient in ingredients:
-            shopping_cart += (
-                f'{ingredient["ingredient__name"]}: '
-                f'{ingredient["amount"]} '
-                f'{ingredient["ingredient__measurement_unit"]}\n'
-            )
-        response = HttpResponse(
-            shopping_cart, content_type='text/plain'
-        )
-        response['Content-Disposition'] = (
-            f'attachment; filename={filename}.txt'
-        )
-        return response
+    def get_shopping_list(user):
+        return ShoppingListItem.objects.filter(user=user).values(
+            'ingredient__name',
+            'ingredient__measurement_unit',
+            total_amount=F('amount'),
+        ).order_by('ingredient__name')
 
     @action(
         methods=('GET',),
         detail=False,
-        permission_classes=(AuthorOrAdminOrReadOnly,)
+        permission_classes=(IsAuthenticated,),
+        renderer_classes=(
+            PlainTextRenderer, CSVRenderer, JSONRenderer, PDFRenderer
+        ),
     )
     def download_shopping_cart(self, request):
-        user = self.request.user
-        ingredients = IngredientInRecipes.objects.filter(
-            recipe__shopping_cart__user=request.user
-        ).order_by('ingredient__name').values(
-            'ingredient__name', 'ingredient__measurement_unit'
-        ).annotate(amount=Sum('amount'))
-        return self.get_shopping_cart(ingredients, user)
+        """Строки читаются до ответа: под ASGI потоковый ответ
+        итерируется в цикле событий, где запросы к БД запрещены.
+        Список - не больше одной строки на ингредиент справочника."""
+        return shopping_cart_response(
+            list(self.get_shopping_list(request.user)),
+            request.user,
+            request.accepted_renderer,
+        )
+
+    @action(
+        methods=('GET',),
+        detail=False,
+        permission_classes=(IsAuthenticated,),
+        pagination_class=FeedPagination,
+    )
+    def feed(self, request):
+        page = self.paginate_queryset(self.get_queryset())
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @action(
+        methods=('GET',),
+        detail=False,
+        permission_classes=(IsAuthenticated,),
+    )
+    def shopping_cart_summary(self, request):
+        items = ShoppingListItem.objects.filter(
+            user=request.user
+        ).select_related('ingredient').order_by('ingredient__name')
+        return Response(
+            ShoppingListItemSerializer(items, many=True).data
+        )
+
+    @action(methods=('GET',), detail=True)
+    def similar(self, request, pk):
+        """Похожие рецепты, посчитанные командой compute_similar."""
+        recipes = Recipe.objects.filter(similar_to__recipe_id=pk).annotate(
+            score=F('similar_to__score')
+        ).only(
+            'id', 'name', 'image', 'image_renditions', 'cooking_time'
+        ).order_by('-score', 'id')[:SIMILAR_RECIPES_LIMIT]
+        if not recipes and not Recipe.objects.filter(pk=pk).exists():
+            raise Http404
+        return Response(SimilarRecipeSerializer(
+            recipes, many=True, context={'request': request}
+        ).data)
+
+
+class CacheStatsView(APIView):
+    """Статистика попаданий в кэши API текущего процесса."""
+
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request):
+        return Response({
+            name: catalog_cache.stats
+            for name, catalog_cache in CatalogCache.registry.items()
+        })
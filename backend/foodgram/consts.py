@@ -4,3 +4,16 @@ RECIPES_MAX_LENGTH = 200
 INGREDIENT_MAX_AMOUNT = 50000
 MIN_NUM = 1
 TWENTY_FOUR_HOURS = 1440
+CATALOG_LRU_SIZE = 256
+CATALOG_CACHE_TIMEOUT = 60 * 60 * 24
+INGREDIENT_SEARCH_LIMIT = 50
+IMPORT_BATCH_SIZE = 1000
+ADMIN_EXACT_COUNT_LIMIT = 10000
+RECIPE_SEARCH_CONFIG = 'russian'
+SEARCH_INDEX_BATCH_SIZE = 500
+FEED_FANOUT_LIMIT = 10000
+FEED_FANOUT_BATCH_SIZE = 1000
+FEED_BACKFILL_SIZE = 100
+SIMILAR_RECIPES_LIMIT = 10
+SIMILAR_TAG_BOOST = 0.2
+SIMILARITY_BATCH_SIZE = 500
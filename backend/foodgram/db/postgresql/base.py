@@ -0,0 +1,107 @@
+import threading
+
+import psycopg2.extras
+from django.db.backends.postgresql import base
+from psycopg2.pool import PoolError, ThreadedConnectionPool
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class BoundedConnectionPool(ThreadedConnectionPool):
+    """Пул, в котором поток ждёт свободное соединение.
+
+    ThreadedConnectionPool сразу бросает PoolError, когда выданы все
+    maxconn соединений, например потокам ASYNC_VIEWS. Здесь getconn
+    ждёт освобождения соединения не дольше timeout секунд.
+    """
+
+    def __init__(self, minconn, maxconn, timeout, *args, **kwargs):
+        super().__init__(minconn, maxconn, *args, **kwargs)
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(maxconn)
+
+    def getconn(self, key=None):
+        if not self._slots.acquire(timeout=self.timeout):
+            raise PoolError(
+                f'Нет свободного соединения в пуле за {self.timeout} с'
+            )
+        try:
+            return super().getconn(key)
+        except Exception:
+            self._slots.release()
+            raise
+
+    def putconn(self, conn=None, key=None, close=False):
+        try:
+            super().putconn(conn, key, close)
+        finally:
+            self._slots.release()
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """PostgreSQL с проверкой постоянных соединений и пулом.
+
+    CONN_HEALTH_CHECKS повторяет поведение Django 4.1: переиспользуемое
+    соединение проверяется перед первым запросом. POOL включает пул
+    соединений psycopg2 внутри процесса, если задан MAX_SIZE.
+    """
+
+    health_check_pending = False
+
+    @property
+    def pool_settings(self):
+        return self.settings_dict.get('POOL') or {}
+
+    def get_pool(self, conn_params):
+        with _pools_lock:
+            pool = _pools.get(self.alias)
+            if pool is None:
+                pool = BoundedConnectionPool(
+                    self.pool_settings.get('MIN_SIZE', 0),
+                    self.pool_settings['MAX_SIZE'],
+                    self.pool_settings.get('TIMEOUT', 10),
+                    **conn_params
+                )
+                _pools[self.alias] = pool
+            return pool
+
+    def get_new_connection(self, conn_params):
+        if not self.pool_settings.get('MAX_SIZE'):
+            return super().get_new_connection(conn_params)
+        connection = self.get_pool(conn_params).getconn()
+        options = self.settings_dict['OPTIONS']
+        self.isolation_level = options.get(
+            'isolation_level', connection.isolation_level
+        )
+        if self.isolation_level != connection.isolation_level:
+            connection.set_session(isolation_level=self.isolation_level)
+        psycopg2.extras.register_default_jsonb(
+            conn_or_curs=connection, loads=lambda x: x
+        )
+        return connection
+
+    def _close(self):
+        pool = _pools.get(self.alias)
+        if pool is None or self.connection is None:
+            return super()._close()
+        with self.wrap_database_errors:
+            # Пул сам откатит незавершённую транзакцию
+            # и закроет сломанное соединение.
+            return pool.putconn(self.connection)
+
+    def close_if_unusable_or_obsolete(self):
+        super().close_if_unusable_or_obsolete()
+        self.health_check_pending = (
+            self.connection is not None
+            and self.settings_dict.get('CONN_HEALTH_CHECKS', False)
+        )
+
+    def ensure_connection(self):
+        if self.health_check_pending:
+            self.health_check_pending = False
+            if (self.connection is not None
+                    and not self.in_atomic_block
+                    and not self.is_usable()):
+                self.close()
+        super().ensure_connection()
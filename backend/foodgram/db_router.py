@@ -0,0 +1,48 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+
+REPLICA = 'replica'
+_use_replica = ContextVar('use_replica', default=False)
+
+
+def use_replica(enabled):
+    """Включает чтение с реплики для текущего контекста."""
+    return _use_replica.set(enabled)
+
+
+def reset_replica(token):
+    _use_replica.reset(token)
+
+
+@contextmanager
+def primary_db():
+    """Читать из основной базы внутри блока, даже в действии с репликой."""
+    token = _use_replica.set(False)
+    try:
+        yield
+    finally:
+        _use_replica.reset(token)
+
+
+class ReplicaRouter:
+    """Чтение в помеченном контексте - с реплики, остальное - с основной.
+
+    Контекст помечает api.mixins.ReplicaReadMixin для действий чтения
+    вьюсетов API.
+    """
+
+    def db_for_read(self, model, **hints):
+        if _use_replica.get() and REPLICA in settings.DATABASES:
+            return REPLICA
+        return None
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db != REPLICA
@@ -0,0 +1,278 @@
+import asyncio
+import json
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
+from django.utils.decorators import sync_and_async_middleware
+
+logger = logging.getLogger('foodgram.requests')
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+PHASES = ('db', 'serialize', 'render')
+
+_current = ContextVar('request_metrics', default=None)
+
+
+class RequestMetrics:
+    """Счётчики одного запроса."""
+
+    __slots__ = ('start', 'queries', 'durations', 'active')
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.queries = 0
+        self.durations = dict.fromkeys(PHASES, 0.0)
+        self.active = None
+
+
+@contextmanager
+def timing(phase):
+    """Добавляет время блока к фазе текущего запроса.
+
+    Вложенные блоки не учитываются повторно: время вложенного
+    сериализатора уже входит во время внешнего.
+    """
+    metrics = _current.get()
+    if metrics is None or metrics.active is not None:
+        yield
+        return
+    metrics.active = phase
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.durations[phase] += time.perf_counter() - start
+        metrics.active = None
+
+
+def query_wrapper(execute, sql, params, many, context):
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.queries += 1
+        metrics.durations['db'] += time.perf_counter() - start
+
+
+def install_query_wrapper(sender, connection, **kwargs):
+    """Подключает query_wrapper к каждому новому соединению с БД.
+
+    Это тот же механизм, что и connection.execute_wrapper(), но без
+    установки на каждый запрос, и он работает в потоках async view.
+    """
+    if query_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(query_wrapper)
+
+
+connection_created.connect(install_query_wrapper)
+
+
+class Histogram:
+    """Гистограмма в формате Prometheus с метками."""
+
+    def __init__(self, name, documentation, buckets, labels):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = buckets
+        self.labels = labels
+        self.series = {}
+
+    def observe(self, labels, value):
+        series = self.series.get(labels)
+        if series is None:
+            series = self.series[labels] = {
+                'buckets': [0] * (len(self.buckets) + 1),
+                'sum': 0.0,
+                'count': 0,
+            }
+        series['buckets'][bisect_left(self.buckets, value)] += 1
+        series['sum'] += value
+        series['count'] += 1
+
+    def expose(self):
+        yield f'# HELP {self.name} {self.documentation}'
+        yield f'# TYPE {self.name} histogram'
+        bounds = [str(bound) for bound in self.buckets] + ['+Inf']
+        for labels, series in self.series.items():
+            base = format_labels(zip(self.labels, labels))
+            total = 0
+            for bound, count in zip(bounds, series['buckets']):
+                total += count
+                yield (f'{self.name}_bucket{{{base},le="{bound}"}} '
+                       f'{total}')
+            yield f'{self.name}_sum{{{base}}} {series["sum"]:.6f}'
+            yield f'{self.name}_count{{{base}}} {series["count"]}'
+
+
+def format_labels(pairs):
+    return ','.join(
+        '{}="{}"'.format(
+            name, str(value).replace('\\', '\\\\').replace('"', '\\"')
+        )
+        for name, value in pairs
+    )
+
+
+class MetricsRegistry:
+    """Метрики запросов процесса.
+
+    Каждый воркер gunicorn хранит свои значения, как и статистика
+    кэшей в CacheStatsView.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = {}
+        self.histograms = {
+            'duration': Histogram(
+                'foodgram_request_duration_seconds',
+                'Время обработки запроса.',
+                DURATION_BUCKETS, ('route', 'method'),
+            ),
+            'queries': Histogram(
+                'foodgram_request_db_queries',
+                'Число запросов к БД за запрос.',
+                QUERY_BUCKETS, ('route', 'method'),
+            ),
+            **{
+                phase: Histogram(
+                    f'foodgram_request_{phase}_seconds',
+                    f'Время фазы {phase} за запрос.',
+                    DURATION_BUCKETS, ('route', 'method'),
+                )
+                for phase in PHASES
+            },
+        }
+        self.collectors = []
+
+    def register_collector(self, collector):
+        """collector() возвращает строки метрик в формате Prometheus."""
+        self.collectors.append(collector)
+
+    def observe(self, route, method, status, total, metrics):
+        labels = (route, method)
+        with self._lock:
+            key = (route, method, status)
+            self.requests[key] = self.requests.get(key, 0) + 1
+            self.histograms['duration'].observe(labels, total)
+            self.histograms['queries'].observe(labels, metrics.queries)
+            for phase in PHASES:
+                self.histograms[phase].observe(
+                    labels, metrics.durations[phase]
+                )
+
+    def expose(self):
+        lines = [
+            '# HELP foodgram_requests_total Количество запросов.',
+            '# TYPE foodgram_requests_total counter',
+        ]
+        with self._lock:
+            for labels, count in self.requests.items():
+                lines.append('foodgram_requests_total{{{}}} {}'.format(
+                    format_labels(zip(('route', 'method', 'status'), labels)),
+                    count,
+                ))
+            for histogram in self.histograms.values():
+                lines.extend(histogram.expose())
+        for collector in self.collectors:
+            lines.extend(collector())
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+
+def milliseconds(seconds):
+    return round(seconds * 1000, 3)
+
+
+def finish(request, response, metrics):
+    total = time.perf_counter() - metrics.start
+    match = request.resolver_match
+    route = match.view_name if match else 'unmatched'
+    registry.observe(route, request.method, response.status_code,
+                     total, metrics)
+    durations = metrics.durations
+    if settings.METRICS['SERVER_TIMING']:
+        response['Server-Timing'] = ', '.join(
+            [f'db;dur={milliseconds(durations["db"])};'
+             f'desc="{metrics.queries} queries"']
+            + [f'{phase};dur={milliseconds(durations[phase])}'
+               for phase in PHASES[1:]]
+            + [f'total;dur={milliseconds(total)}']
+        )
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(json.dumps({
+            'route': route,
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'duration_ms': milliseconds(total),
+            'db_queries': metrics.queries,
+            **{
+                f'{phase}_ms': milliseconds(durations[phase])
+                for phase in PHASES
+            },
+        }, ensure_ascii=False))
+    return response
+
+
+@sync_and_async_middleware
+def request_metrics_middleware(get_response):
+    """Время запроса, запросов к БД, сериализации и рендеринга.
+
+    Добавляет заголовок Server-Timing, пишет строку JSON в лог
+    foodgram.requests и обновляет гистограммы для /metrics.
+    """
+    if asyncio.iscoroutinefunction(get_response):
+        async def middleware(request):
+            metrics = RequestMetrics()
+            token = _current.set(metrics)
+            try:
+                response = await get_response(request)
+            finally:
+                _current.reset(token)
+            return finish(request, response, metrics)
+    else:
+        def middleware(request):
+            metrics = RequestMetrics()
+            token = _current.set(metrics)
+            try:
+                response = get_response(request)
+            finally:
+                _current.reset(token)
+            return finish(request, response, metrics)
+    return middleware
+
+
+def is_metrics_allowed(request):
+    """Bearer-токен METRICS_TOKEN или сотрудник; без токена в DEBUG - все."""
+    token = settings.METRICS['TOKEN']
+    if token and constant_time_compare(
+        request.headers.get('Authorization', ''), f'Bearer {token}'
+    ):
+        return True
+    if not token and settings.DEBUG:
+        return True
+    return request.user.is_staff
+
+
+def metrics_view(request):
+    """Метрики процесса в текстовом формате Prometheus."""
+    if not is_metrics_allowed(request):
+        return HttpResponseForbidden()
+    return HttpResponse(
+        registry.expose(), content_type='text/plain; version=0.0.4'
+    )
@@ -13,7 +13,7 @@ SECRET_KEY = os.getenv(
     default='django-insecure-_+eeg%gte843uwx9a(u+)n1yn8wczstwab&809sk8+ha+p#3%#'
 )
 
-DEBUG = os.getenv('DEBUG', False)
+DEBUG = os.getenv('DEBUG', 'False') == 'True'
 DEBUG_SQLITE = os.getenv('DEBUG_SQLITE', False)
 
 ALLOWED_HOSTS = str(os.getenv('ALLOWED_HOSTS')).split()
@@ -39,6 +39,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'foodgram.metrics.request_metrics_middleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -74,17 +75,83 @@ DATABASES = {
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
     },
     'prod': {
-        'ENGINE': os.getenv('DB_ENGINE', 'django.db.backends.postgresql'),
+        'ENGINE': os.getenv('DB_ENGINE', 'foodgram.db.postgresql'),
         'NAME': os.getenv('DB_NAME'),
         'USER': os.getenv('POSTGRES_USER'),
         'PASSWORD': os.getenv('POSTGRES_PASSWORD'),
         'HOST': os.getenv('DB_HOST'),
-        'PORT': os.getenv('DB_PORT')
+        'PORT': os.getenv('DB_PORT'),
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': os.getenv(
+            'DB_CONN_HEALTH_CHECKS', 'True') == 'True',
+        'POOL': {
+            'MIN_SIZE': int(os.getenv('DB_POOL_MIN_SIZE', 0)),
+            'MAX_SIZE': int(os.getenv('DB_POOL_MAX_SIZE', 0)),
+            'TIMEOUT': float(os.getenv('DB_POOL_TIMEOUT', 10)),
+        },
     }
 }
 
 DATABASES['default'] = DATABASES['test' if DEBUG_SQLITE else 'prod']
 
+if os.getenv('DB_REPLICA_HOST') and not DEBUG_SQLITE:
+    DATABASES['replica'] = {
+        **DATABASES['prod'],
+        'HOST': os.getenv('DB_REPLICA_HOST'),
+        'PORT': os.getenv('DB_REPLICA_PORT', DATABASES['prod']['PORT']),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['foodgram.db_router.ReplicaRouter']
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    }
+}
+
+# Версии кэшей API, персональные данные, ETag и отзыв токенов должны быть
+# общими для всех воркеров. С кэшем в памяти процесса они работают только
+# при DEBUG, иначе отключаются.
+SHARED_CACHE = DEBUG or CACHES['default']['BACKEND'] not in (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+METRICS = {
+    'SERVER_TIMING': os.getenv('METRICS_SERVER_TIMING', 'False') == 'True',
+    'TOKEN': os.getenv('METRICS_TOKEN', ''),
+}
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'message': {'format': '%(message)s'},
+    },
+    'handlers': {
+        'requests': {
+            'class': 'logging.StreamHandler',
+            'formatter': 'message',
+        },
+    },
+    'loggers': {
+        'foodgram.requests': {
+            'handlers': ['requests'],
+            'level': os.getenv('REQUEST_LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
+    },
+}
+
+ASYNC_VIEWS = {
+    'ENABLED': os.getenv('ASYNC_VIEWS', 'False') == 'True',
+    'WORKERS': int(os.getenv('ASYNC_VIEWS_WORKERS', 16)),
+}
+
 AUTH_USER_MODEL = 'users.User'
 
 AUTH_PASSWORD_VALIDATORS = [
@@ -123,12 +190,27 @@ EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = Path(BASE_DIR, 'send_emails')
 EMAIL_NO_REPLY = 'noreply@foodgram.fake'
 
+IMAGE_PIPELINE = {
+    'backend': os.getenv('IMAGE_PIPELINE_BACKEND', 'thread'),
+    'workers': int(os.getenv('IMAGE_PIPELINE_WORKERS', 2)),
+}
+
+FEED_FANOUT = {
+    'backend': os.getenv('FEED_FANOUT_BACKEND', 'thread'),
+    'workers': int(os.getenv('FEED_FANOUT_WORKERS', 1)),
+}
+
+SHOPPING_CART_PDF_FONT = os.getenv(
+    'SHOPPING_CART_PDF_FONT',
+    default='/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf'
+)
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
     ),
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend',
@@ -136,14 +218,26 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
     ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.JSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 6
 }
 
+AUTH_TOKEN = {
+    'CACHE_TIMEOUT': int(os.getenv('AUTH_TOKEN_CACHE_TIMEOUT', 60)),
+    'SIGNED': (os.getenv('AUTH_TOKEN_SIGNED', 'False') == 'True'
+               and SHARED_CACHE),
+    'SIGNED_MAX_AGE': int(os.getenv('AUTH_TOKEN_SIGNED_MAX_AGE', 60 * 60 * 24)),
+}
+
 DJOSER = {
     'SERIALIZERS': {
         'user': 'api.serializers.UserSerializer',
         'current_user': 'api.serializers.UserSerializer',
+        'token': 'api.serializers.TokenSerializer',
     },
     'PERMISSIONS': {
         'user_list': ['rest_framework.permissions.AllowAny'],
@@ -1,17 +1,21 @@
+from django.apps import apps
 from django.contrib import admin
 
+from foodgram.admin import LargeTableAdminMixin
 from foodgram.consts import MIN_NUM
+from recipes.images import image_pipeline
 from recipes.models import (FavoriteRecipes, Ingredient, IngredientInRecipes,
                             Recipe, ShoppingCart, Tag, TagInRecipes)
+from recipes.search import index_recipes
+from recipes.shopping_list import add_recipe_to_carts
 
 
 @admin.register(Ingredient)
-class IngredientAdmin(admin.ModelAdmin):
+class IngredientAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     """Класс для администирования ингредиентов."""
 
     list_display = ('id', 'name', 'measurement_unit',)
-    list_filter = ('name',)
-    search_fields = ('name',)
+    search_fields = ('^name',)
 
 
 @admin.register(Tag)
@@ -19,49 +23,82 @@ class TagAdmin(admin.ModelAdmin):
     """Класс для администрирования тегов."""
 
     list_display = ('id', 'name', 'color', 'slug',)
-    list_filter = ('name', 'slug',)
-    search_fields = ('name',)
+    search_fields = ('name', 'slug',)
 
 
 class TagInRecipesInline(admin.TabularInline):
     model = TagInRecipes
     min_num = MIN_NUM
+    extra = 0
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('tag', 'recipe')
 
 
 class IngredientInRecipeInline(admin.TabularInline):
     model = IngredientInRecipes
     min_num = MIN_NUM
+    extra = 0
+    autocomplete_fields = ('ingredient',)
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related(
+            'ingredient', 'recipe'
+        )
 
 
 @admin.register(Recipe)
-class RecipeAdmin(admin.ModelAdmin):
-    """Класс для администрирования рецептов."""
+class RecipeAdmin(LargeTableAdminMixin, admin.ModelAdmin):
+    """Класс для администрирования рецептов.
+
+    Автора ищут по началу имени пользователя или почты; список рецептов
+    автора открывается ссылкой из списка пользователей.
+    """
 
     list_display = (
         'id',
         'name',
         'author',
-        'text',
         'cooking_time',
         'pub_date',
         'get_favorite_count',
         'get_ingredients',
         'get_tags',
     )
-    list_display_links = ('name', 'author', 'pub_date',)
-    list_filter = ('name', 'author', 'pub_date',)
-    search_fields = (
-        'name',
-        'author',
-        'cooking_time',
-        'ingredients',
-        'tags',
-    )
+    list_display_links = ('name',)
+    list_filter = ('tags', 'pub_date',)
+    search_fields = ('^name', '^author__username', '^author__email')
+    autocomplete_fields = ('author',)
     inlines = (IngredientInRecipeInline, TagInRecipesInline)
 
-    @admin.display(description='Количество избранных')
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related(
+            'author'
+        ).prefetch_related('tags', 'ingredients')
+
+    def save_model(self, request, obj, form, change):
+        """Новое или заменённое фото уходит в очередь на уменьшенные копии,
+        как и при сохранении через API."""
+        super().save_model(request, obj, form, change)
+        if not change or 'image' in form.changed_data:
+            image_pipeline.schedule(obj)
+
+    def save_related(self, request, form, formsets, change):
+        """Ингредиенты из инлайнов попадают в поиск и списки покупок,
+        похожие рецепты пересчитываются следующим запуском compute_similar."""
+        recipe_id = form.instance.pk
+        if change:
+            add_recipe_to_carts(apps, recipe_id, sign=-1)
+        super().save_related(request, form, formsets, change)
+        if change:
+            add_recipe_to_carts(apps, recipe_id)
+        index_recipes(apps, [recipe_id])
+        Recipe.objects.filter(pk=recipe_id).update(similar_stale=True)
+
+    @admin.display(description='Количество избранных',
+                   ordering='favorites_count')
     def get_favorite_count(self, obj):
-        return obj.favorites.count()
+        return obj.favorites_count
 
     @admin.display(description='Ингредиенты')
     def get_ingredients(self, obj):
@@ -74,25 +111,33 @@ class RecipeAdmin(admin.ModelAdmin):
         return ', '.join([tags.name for tags in obj.tags.all()])
 
 
+class UserRecipeAdmin(LargeTableAdminMixin, admin.ModelAdmin):
+    """Связи пользователя и рецепта: без фильтров по всем значениям."""
+
+    list_display = ('id', 'user', 'recipe',)
+    list_select_related = ('user', 'recipe',)
+    search_fields = ('^user__username', '^recipe__name',)
+    autocomplete_fields = ('user', 'recipe',)
+    ordering = ('-id',)
+
+
 @admin.register(TagInRecipes)
-class RecipeTagsAdmin(admin.ModelAdmin):
+class RecipeTagsAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     """Класс для администрирования тегов рецептов."""
 
     list_display = ('id', 'tag', 'recipe',)
-    list_filter = ('tag', 'recipe',)
+    list_select_related = ('tag', 'recipe',)
+    list_filter = ('tag',)
+    search_fields = ('^recipe__name',)
+    autocomplete_fields = ('recipe',)
+    ordering = ('-id',)
 
 
 @admin.register(FavoriteRecipes)
-class FavoriteRecipesAdmin(admin.ModelAdmin):
+class FavoriteRecipesAdmin(UserRecipeAdmin):
     """Класс для администрирования избранных рецептов."""
 
-    list_display = ('id', 'user', 'recipe',)
-    list_filter = ('user', 'recipe',)
-
 
 @admin.register(ShoppingCart)
-class UserShoppingCartAdmin(admin.ModelAdmin):
+class UserShoppingCartAdmin(UserRecipeAdmin):
     """Класс для администрирования пользовательской корзины."""
-
-    list_display = ('id', 'user', 'recipe',)
-    list_filter = ('user', 'recipe',)
@@ -0,0 +1,33 @@
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def change_counter(queryset, field, delta):
+    """Атомарно изменяет счётчик через F(), без чтения строки."""
+    if delta < 0:
+        queryset = queryset.filter(**{f'{field}__gte': -delta})
+    queryset.update(**{field: F(field) + delta})
+
+
+def count_subquery(model, field):
+    return Coalesce(Subquery(
+        model.objects.filter(**{field: OuterRef('pk')}).order_by().values(
+            field
+        ).annotate(total=Count('pk')).values('total')
+    ), 0)
+
+
+def recount(models):
+    """Пересчитывает все денормализованные счётчики одним UPDATE на поле.
+
+    models - реестр моделей: django.apps.apps или apps из миграции.
+    """
+    recipe = models.get_model('recipes', 'Recipe')
+    user = models.get_model('users', 'User')
+    favorite = models.get_model('recipes', 'FavoriteRecipes')
+    follow = models.get_model('users', 'Follow')
+    recipe.objects.update(favorites_count=count_subquery(favorite, 'recipe'))
+    user.objects.update(
+        recipes_count=count_subquery(recipe, 'author'),
+        followers_count=count_subquery(follow, 'author'),
+    )
@@ -0,0 +1,193 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import (DEFAULT_DB_ALIAS, close_old_connections, connections,
+                       transaction)
+
+from foodgram.consts import (FEED_BACKFILL_SIZE, FEED_FANOUT_BATCH_SIZE,
+                             FEED_FANOUT_LIMIT)
+from recipes.models import FeedEntry, Recipe
+from users.models import Follow
+
+logger = logging.getLogger(__name__)
+
+
+def fan_out(recipe_id):
+    """Добавляет новый рецепт в ленты подписчиков автора пачками.
+
+    Рецепты авторов с FEED_FANOUT_LIMIT подписчиков и больше не
+    рассылаются. Пока рецепт не разослан (fanned_out), лента читает
+    его из рецептов (feed_recipe_ids), поэтому рецепт не пропадает
+    из лент, когда число подписчиков автора переходит порог.
+    """
+    recipe = Recipe.objects.filter(
+        pk=recipe_id, author__followers_count__lt=FEED_FANOUT_LIMIT
+    ).values('author_id', 'pub_date').first()
+    if recipe is None:
+        return
+    last_user_id = 0
+    while True:
+        followers = list(Follow.objects.filter(
+            author_id=recipe['author_id'], user_id__gt=last_user_id
+        ).order_by('user_id').values_list(
+            'user_id', flat=True
+        )[:FEED_FANOUT_BATCH_SIZE])
+        if not followers:
+            break
+        FeedEntry.objects.bulk_create(
+            [
+                FeedEntry(
+                    user_id=user_id,
+                    recipe_id=recipe_id,
+                    pub_date=recipe['pub_date'],
+                )
+                for user_id in followers
+            ],
+            ignore_conflicts=True,
+        )
+        last_user_id = followers[-1]
+    Recipe.objects.filter(pk=recipe_id).update(fanned_out=True)
+
+
+def backfill(user_id, author_id):
+    """Добавляет в ленту нового подписчика последние разосланные
+    рецепты автора; остальные лента читает из рецептов."""
+    recipes = Recipe.objects.filter(
+        author_id=author_id, fanned_out=True
+    ).order_by('-pub_date', '-id').values_list(
+        'id', 'pub_date'
+    )[:FEED_BACKFILL_SIZE]
+    FeedEntry.objects.bulk_create(
+        [
+            FeedEntry(user_id=user_id, recipe_id=pk, pub_date=pub_date)
+            for pk, pub_date in recipes
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def prune(user_id, author_id):
+    """Убирает рецепты автора из ленты отписавшегося пользователя."""
+    FeedEntry.objects.filter(
+        user_id=user_id, recipe__author_id=author_id
+    ).delete()
+
+
+def feed_recipe_ids(user, cursor, limit):
+    """Id рецептов страницы ленты в порядке (-pub_date, -id).
+
+    Разосланные рецепты берутся из таблицы ленты, остальные (авторов
+    с большой аудиторией и ещё не разосланные) - из рецептов (fan-out
+    при чтении) по частичному индексу recipe_not_fanned_out_idx. Обе
+    выборки идут по индексам от курсора, результаты сливаются.
+    """
+    timeline = FeedEntry.objects.filter(user=user)
+    popular = Recipe.objects.filter(
+        fanned_out=False,
+        author__in=Follow.objects.filter(user=user).values('author'),
+    )
+    if cursor is not None:
+        pub_date, pk = cursor
+        timeline = timeline.filter(pub_date__lte=pub_date).exclude(
+            pub_date=pub_date, recipe_id__gte=pk
+        )
+        popular = popular.filter(pub_date__lte=pub_date).exclude(
+            pub_date=pub_date, id__gte=pk
+        )
+    rows = set(timeline.order_by('-pub_date', '-recipe_id').values_list(
+        'pub_date', 'recipe_id'
+    )[:limit])
+    rows.update(popular.order_by('-pub_date', '-id').values_list(
+        'pub_date', 'id'
+    )[:limit])
+    return [pk for _, pk in sorted(rows, reverse=True)[:limit]]
+
+
+def rebuild(models, using=DEFAULT_DB_ALIAS):
+    """Пересобирает ленты: последние FEED_BACKFILL_SIZE рецептов каждого
+    автора из подписок, кроме авторов с большой аудиторией. Признак
+    fanned_out рецептов выставляется заново по числу подписчиков.
+
+    models - реестр моделей: django.apps.apps или apps из миграции.
+    """
+    names = {
+        name: models.get_model(app, model)._meta.db_table
+        for name, app, model in (
+            ('feed', 'recipes', 'FeedEntry'),
+            ('recipe', 'recipes', 'Recipe'),
+            ('follow', 'users', 'Follow'),
+            ('user', 'users', 'User'),
+        )
+    }
+    with connections[using].cursor() as cursor:
+        cursor.execute('DELETE FROM {feed}'.format(**names))
+        cursor.execute(
+            'UPDATE {recipe} SET fanned_out = author_id IN ('
+            'SELECT id FROM {user} WHERE followers_count < %s)'.format(
+                **names
+            ),
+            (FEED_FANOUT_LIMIT,)
+        )
+        cursor.execute(
+            'INSERT INTO {feed} (user_id, recipe_id, pub_date) '
+            'SELECT f.user_id, r.id, r.pub_date FROM {follow} f '
+            'JOIN (SELECT id, author_id, pub_date, ROW_NUMBER() OVER ('
+            'PARTITION BY author_id ORDER BY pub_date DESC, id DESC'
+            ') AS position FROM {recipe} WHERE fanned_out) r '
+            'ON r.author_id = f.author_id '
+            'WHERE r.position <= %s'.format(**names),
+            (FEED_BACKFILL_SIZE,)
+        )
+
+
+def process_recipe(recipe_id):
+    try:
+        fan_out(recipe_id)
+    except Exception:
+        logger.exception(
+            'Не удалось разослать рецепт %s по лентам', recipe_id
+        )
+
+
+def run_job(recipe_id):
+    close_old_connections()
+    try:
+        process_recipe(recipe_id)
+    finally:
+        close_old_connections()
+
+
+class FeedFanout:
+    """Очередь рассылки новых рецептов по лентам подписчиков.
+
+    Бэкенды те же, что у ImagePipeline: `thread` - пул потоков
+    процесса, `sync` - сразу в текущем потоке.
+    """
+
+    def __init__(self, backend='thread', workers=1):
+        self.backend = backend
+        self.workers = workers
+        self._executor = None
+
+    @property
+    def executor(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.workers,
+                thread_name_prefix='recipe-feed',
+            )
+        return self._executor
+
+    def submit(self, recipe_id):
+        if self.backend == 'sync':
+            process_recipe(recipe_id)
+        else:
+            self.executor.submit(run_job, recipe_id)
+
+    def schedule(self, recipe_id):
+        """Ставит рецепт в очередь после фиксации транзакции."""
+        transaction.on_commit(lambda: self.submit(recipe_id))
+
+
+feed_fanout = FeedFanout(**settings.FEED_FANOUT)
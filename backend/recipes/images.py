@@ -0,0 +1,134 @@
+import logging
+import os.path as path
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from django.dispatch import Signal
+from PIL import Image
+
+from recipes.models import Recipe
+
+logger = logging.getLogger(__name__)
+
+renditions_ready = Signal()
+
+RENDITIONS = {
+    'card': (480, 480),
+    'detail': (1200, 1200),
+}
+RENDITION_FORMATS = {
+    'webp': {'format': 'WEBP', 'quality': 80, 'method': 4},
+    'jpeg': {'format': 'JPEG', 'quality': 82, 'optimize': True},
+}
+RENDITIONS_DIR = 'recipes/renditions'
+
+
+def rendition_name(recipe, rendition, extension):
+    stem = path.splitext(path.basename(recipe.image.name))[0]
+    return f'{RENDITIONS_DIR}/{recipe.id}/{stem}_{rendition}.{extension}'
+
+
+def generate_renditions(recipe_id):
+    """Создаёт уменьшенные копии фото рецепта и сохраняет их пути."""
+    recipe = Recipe.objects.filter(id=recipe_id).first()
+    if recipe is None or not recipe.image:
+        return
+    with recipe.image.open('rb') as file:
+        original = Image.open(file)
+        original.load()
+    if original.mode not in ('RGB', 'L'):
+        original = original.convert('RGB')
+    renditions = {}
+    for rendition, size in RENDITIONS.items():
+        image = original.copy()
+        image.thumbnail(size, Image.LANCZOS)
+        renditions[rendition] = {}
+        for extension, options in RENDITION_FORMATS.items():
+            buffer = BytesIO()
+            image.save(buffer, **options)
+            name = rendition_name(recipe, rendition, extension)
+            if default_storage.exists(name):
+                default_storage.delete(name)
+            renditions[rendition][extension] = default_storage.save(
+                name, ContentFile(buffer.getvalue())
+            )
+    created = {
+        name
+        for formats in renditions.values()
+        for name in formats.values()
+    }
+    updated = Recipe.objects.filter(
+        id=recipe_id, image=recipe.image.name
+    ).update(image_renditions={
+        'source': recipe.image.name,
+        'renditions': renditions,
+    })
+    if updated:
+        renditions_ready.send(sender=Recipe, recipe_id=recipe_id)
+        stale = {
+            name
+            for formats in recipe.image_renditions.get(
+                'renditions', {}
+            ).values()
+            for name in formats.values()
+        } - created
+    else:
+        stale = created
+    for name in stale:
+        default_storage.delete(name)
+
+
+def process_image(recipe_id):
+    try:
+        generate_renditions(recipe_id)
+    except Exception:
+        logger.exception(
+            'Не удалось обработать фото рецепта %s', recipe_id
+        )
+
+
+def run_job(recipe_id):
+    close_old_connections()
+    try:
+        process_image(recipe_id)
+    finally:
+        close_old_connections()
+
+
+class ImagePipeline:
+    """Очередь обработки фото рецептов.
+
+    Бэкенд `thread` обрабатывает фото в пуле потоков процесса,
+    `sync` - сразу в текущем потоке (удобно для отладки и тестов).
+    """
+
+    def __init__(self, backend='thread', workers=2):
+        self.backend = backend
+        self.workers = workers
+        self._executor = None
+
+    @property
+    def executor(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.workers,
+                thread_name_prefix='recipe-images',
+            )
+        return self._executor
+
+    def submit(self, recipe_id):
+        if self.backend == 'sync':
+            process_image(recipe_id)
+        else:
+            self.executor.submit(run_job, recipe_id)
+
+    def schedule(self, recipe):
+        """Ставит рецепт в очередь после фиксации транзакции."""
+        transaction.on_commit(lambda: self.submit(recipe.id))
+
+
+image_pipeline = ImagePipeline(**settings.IMAGE_PIPELINE)
@@ -0,0 +1,386 @@
+import base64
+import io
+import json
+import math
+import statistics
+import tempfile
+import time
+from collections import namedtuple
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import URLResolver
+from django.utils import timezone
+from PIL import Image
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api import urls as api_urls
+from api.catalog_cache import CatalogCache
+from api.pagination import RecipeKeysetPagination
+from recipes.models import (FavoriteRecipes, Ingredient, IngredientInRecipes,
+                            Recipe, ShoppingCart, Tag)
+from users.models import User
+
+Scenario = namedtuple(
+    'Scenario', ('name', 'route', 'method', 'path', 'data', 'budget')
+)
+PERCENTILES = (50, 90, 99)
+PAGE_SIZE = 6
+FIXTURE_FANS = 3
+
+
+def percentile(values, share):
+    """Перцентиль методом ближайшего ранга."""
+    ordered = sorted(values)
+    return ordered[max(math.ceil(share / 100 * len(ordered)) - 1, 0)]
+
+
+def api_routes(patterns=api_urls.urlpatterns, prefix=''):
+    """Имена маршрутов api/urls.py без суффиксов формата и дублей.
+
+    Маршруты djoser с тем же шаблоном, что и у UserViewSet, перекрыты
+    и в отчёт не попадают.
+    """
+    routes = {}
+    for pattern in patterns:
+        regex = prefix + str(pattern.pattern)
+        if isinstance(pattern, URLResolver):
+            for key, name in api_routes(pattern.url_patterns, regex).items():
+                routes.setdefault(key, name)
+        elif '(?P<format>' not in regex:
+            routes.setdefault(regex, pattern.name)
+    return routes
+
+
+def sample_image():
+    buffer = io.BytesIO()
+    Image.new('RGB', (600, 400), 'orange').save(buffer, 'PNG')
+    return 'data:image/png;base64,' + base64.b64encode(
+        buffer.getvalue()
+    ).decode()
+
+
+def fixtures():
+    """Объекты, на которых выполняются сценарии."""
+    user = User.objects.annotate(
+        activity=Count('shopping_cart') + Count('follower')
+    ).filter(recipes_count__gt=0).order_by('-activity', '-recipes_count')
+    user = user.first()
+    if user is None or not Tag.objects.exists():
+        raise CommandError(
+            'В базе нет данных: сначала выполните generate_data.'
+        )
+    foreign = Recipe.objects.exclude(author=user)
+    other = foreign.exclude(favorites__user=user).exclude(
+        shopping_cart__user=user
+    ).first()
+    favorite = foreign.filter(favorites__user=user).first()
+    in_cart = foreign.filter(shopping_cart__user=user).first()
+    author = User.objects.exclude(pk=user.pk).exclude(
+        following__user=user
+    ).first()
+    followed = User.objects.filter(following__user=user).first()
+    if None in (other, favorite, in_cart, author, followed):
+        raise CommandError(
+            'Данных недостаточно для всех сценариев: увеличьте объём '
+            'generate_data.'
+        )
+    return {
+        'user': user,
+        'cursor': RecipeKeysetPagination.encode_cursor(
+            Recipe.objects.order_by('-pub_date', '-id')[PAGE_SIZE]
+        ),
+        'token': Token.objects.get_or_create(user=user)[0].key,
+        'recipe': user.recipes.first().pk,
+        'other': other.pk,
+        'favorite': favorite.pk,
+        'in_cart': in_cart.pk,
+        'author': author.pk,
+        'followed': followed.pk,
+        'tag': Tag.objects.first(),
+        'ingredients': list(
+            Ingredient.objects.values_list('id', flat=True)[:10]
+        ),
+    }
+
+
+def edited_recipe(fx):
+    """Рецепт пользователя для сценариев изменения и удаления.
+
+    У него постоянные ингредиенты и FIXTURE_FANS добавлений в избранное
+    и корзину, поэтому каскад удаления и пересчёт списков покупок не
+    зависят от набора данных. Создаётся в откатываемой транзакции замера.
+    """
+    recipe = Recipe.objects.create(
+        author=fx['user'],
+        name='Рецепт для изменения',
+        text='Описание',
+        image='recipes/benchmark.png',
+        cooking_time=10,
+    )
+    recipe.tags.set([fx['tag']])
+    IngredientInRecipes.objects.bulk_create([
+        IngredientInRecipes(recipe=recipe, ingredient_id=pk, amount=5)
+        for pk in fx['ingredients'][:5]
+    ])
+    for fan in User.objects.exclude(pk=fx['user'].pk)[:FIXTURE_FANS]:
+        FavoriteRecipes.objects.create(user=fan, recipe=recipe)
+        ShoppingCart.objects.create(user=fan, recipe=recipe)
+    return recipe.pk
+
+
+def scenarios(fx):
+    """Сценарии по всем маршрутам api/urls.py и бюджеты запросов к БД.
+
+    Бюджет - число запросов при холодном кэше. Изменяющие запросы
+    выполняются в транзакции, которая откатывается.
+    """
+    recipe = {
+        'tags': [fx['tag'].pk],
+        'ingredients': [
+            {'id': pk, 'amount': 10} for pk in fx['ingredients']
+        ],
+        'name': 'Рецепт для замера',
+        'text': 'Описание',
+        'cooking_time': 10,
+    }
+    user = {
+        'email': 'benchmark-new@example.com',
+        'username': 'benchmark_new',
+        'first_name': 'Имя',
+        'last_name': 'Фамилия',
+        'password': 'Zq7-mellon-Kettle',
+    }
+    return [
+        Scenario('api root', 'api-root', 'get', '/api/', None, 1),
+        Scenario('cache stats', 'cache-stats', 'get',
+                 '/api/cache-stats/', None, 1),
+        Scenario('tags list', 'tags-list', 'get', '/api/tags/', None, 2),
+        Scenario('tag detail', 'tags-detail', 'get',
+                 f'/api/tags/{fx["tag"].pk}/', None, 2),
+        Scenario('ingredients search', 'ingredients-list', 'get',
+                 '/api/ingredients/?name=ин', None, 3),
+        Scenario('ingredient detail', 'ingredients-detail', 'get',
+                 f'/api/ingredients/{fx["ingredients"][0]}/', None, 2),
+        Scenario('recipes list', 'recipes-list', 'get',
+                 '/api/recipes/', None, 9),
+        Scenario('recipes filtered', 'recipes-list', 'get',
+                 f'/api/recipes/?tags={fx["tag"].slug}&is_favorited=1',
+                 None, 10),
+        Scenario('recipes search', 'recipes-list', 'get',
+                 f'/api/recipes/?search=рецепт&tags={fx["tag"].slug}',
+                 None, 10),
+        Scenario('recipes cursor', 'recipes-list', 'get',
+                 f'/api/recipes/?cursor={fx["cursor"]}', None, 8),
+        Scenario('feed', 'recipes-feed', 'get',
+                 '/api/recipes/feed/', None, 7),
+        Scenario('recipe create', 'recipes-list', 'post',
+                 '/api/recipes/', {**recipe, 'image': sample_image()}, 17),
+        Scenario('recipe detail', 'recipes-detail', 'get',
+                 f'/api/recipes/{fx["recipe"]}/', None, 8),
+        Scenario('similar recipes', 'recipes-similar', 'get',
+                 f'/api/recipes/{fx["recipe"]}/similar/', None, 2),
+        Scenario('recipe update', 'recipes-detail', 'patch',
+                 f'/api/recipes/{fx["edited"]}/', recipe, 18),
+        Scenario('recipe delete', 'recipes-detail', 'delete',
+                 f'/api/recipes/{fx["edited"]}/', None, 15),
+        Scenario('download shopping cart',
+                 'recipes-download-shopping-cart', 'get',
+                 '/api/recipes/download_shopping_cart/', None, 2),
+        Scenario('shopping cart summary',
+                 'recipes-shopping-cart-summary', 'get',
+                 '/api/recipes/shopping_cart_summary/', None, 2),
+        Scenario('favorite add', 'recipes-favorite', 'post',
+                 f'/api/recipes/{fx["other"]}/favorite/', None, 7),
+        Scenario('favorite delete', 'recipes-favorite', 'delete',
+                 f'/api/recipes/{fx["favorite"]}/favorite/', None, 5),
+        Scenario('shopping cart add', 'recipes-shopping-cart', 'post',
+                 f'/api/recipes/{fx["other"]}/shopping_cart/', None, 7),
+        Scenario('shopping cart delete', 'recipes-shopping-cart', 'delete',
+                 f'/api/recipes/{fx["in_cart"]}/shopping_cart/', None, 6),
+        Scenario('users list', 'users-list', 'get', '/api/users/', None, 6),
+        Scenario('user register', 'users-list', 'post',
+                 '/api/users/', user, 7),
+        Scenario('user detail', 'users-detail', 'get',
+                 f'/api/users/{fx["author"]}/', None, 5),
+        Scenario('me', 'users-me', 'get', '/api/users/me/', None, 5),
+        Scenario('subscriptions', 'users-subscriptions', 'get',
+                 '/api/users/subscriptions/?recipes_limit=3', None, 7),
+        Scenario('subscribe', 'users-subscribe', 'post',
+                 f'/api/users/{fx["author"]}/subscribe/', None, 9),
+        Scenario('unsubscribe', 'users-subscribe', 'delete',
+                 f'/api/users/{fx["followed"]}/subscribe/', None, 5),
+        Scenario('set password', 'users-set-password', 'post',
+                 '/api/users/set_password/',
+                 {'current_password': 'wrong', 'new_password': 'x'}, 1),
+        Scenario('set email', 'users-set-username', 'post',
+                 '/api/users/set_email/',
+                 {'current_password': 'wrong', 'new_email': 'x'}, 2),
+        Scenario('activation', 'users-activation', 'post',
+                 '/api/users/activation/', {'uid': 'x', 'token': 'x'}, 1),
+        Scenario('resend activation', 'users-resend-activation', 'post',
+                 '/api/users/resend_activation/',
+                 {'email': 'nobody@example.com'}, 2),
+        Scenario('reset password', 'users-reset-password', 'post',
+                 '/api/users/reset_password/',
+                 {'email': 'nobody@example.com'}, 2),
+        Scenario('reset password confirm', 'users-reset-password-confirm',
+                 'post', '/api/users/reset_password_confirm/',
+                 {'uid': 'x', 'token': 'x', 'new_password': 'x'}, 1),
+        Scenario('reset email', 'users-reset-username', 'post',
+                 '/api/users/reset_email/',
+                 {'email': 'nobody@example.com'}, 2),
+        Scenario('reset email confirm', 'users-reset-username-confirm',
+                 'post', '/api/users/reset_email_confirm/',
+                 {'uid': 'x', 'token': 'x', 'new_email': 'x'}, 2),
+        Scenario('login', 'login', 'post', '/api/auth/token/login/',
+                 {'email': 'nobody@example.com', 'password': 'x'}, 3),
+        Scenario('logout', 'logout', 'post',
+                 '/api/auth/token/logout/', None, 3),
+    ]
+
+
+def clear_caches():
+    cache.clear()
+    for catalog in CatalogCache.registry.values():
+        catalog.clear_local()
+
+
+class Command(BaseCommand):
+    help = ('Замер задержек и числа запросов к БД по всем маршрутам API. '
+            'Запускайте на данных generate_data; отчёт --output можно '
+            'сравнить с отчётом другого коммита через --compare.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--repeat', type=int, default=20,
+            help='Количество повторов каждого сценария'
+        )
+        parser.add_argument(
+            '--only', help='Запускать сценарии, имя которых содержит строку'
+        )
+        parser.add_argument(
+            '--label', default='', help='Метка отчёта, например хеш коммита'
+        )
+        parser.add_argument(
+            '--output', help='Сохранить отчёт в JSON-файл'
+        )
+        parser.add_argument(
+            '--compare', help='JSON-отчёт предыдущего запуска для сравнения'
+        )
+
+    def handle(self, *args, **options):
+        previous = {}
+        if options['compare']:
+            with open(options['compare'], encoding='utf-8') as file:
+                previous = json.load(file)['scenarios']
+        fx = fixtures()
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {fx["token"]}')
+        report = {
+            'meta': {
+                'label': options['label'],
+                'created': timezone.now().isoformat(),
+                'database': connection.vendor,
+                'repeat': options['repeat'],
+                'users': User.objects.count(),
+                'recipes': Recipe.objects.count(),
+            },
+            'scenarios': {},
+            'violations': [],
+        }
+        # Фото из сценариев пишутся во временный каталог, а рецепт для
+        # изменения и удаления живёт только в откатываемой транзакции.
+        with tempfile.TemporaryDirectory() as media_root, override_settings(
+            ALLOWED_HOSTS=['testserver'], MEDIA_ROOT=media_root
+        ), transaction.atomic():
+            fx['edited'] = edited_recipe(fx)
+            selected = [
+                scenario for scenario in scenarios(fx)
+                if not options['only'] or options['only'] in scenario.name
+            ]
+            for scenario in selected:
+                result = self.measure(client, scenario, options['repeat'])
+                report['scenarios'][scenario.name] = result
+                self.check_budget(scenario, result, report['violations'])
+                self.write_result(
+                    scenario, result, previous.get(scenario.name)
+                )
+            transaction.set_rollback(True)
+        if not options['only']:
+            covered = {scenario.route for scenario in selected}
+            for route in sorted(set(api_routes().values()) - covered):
+                report['violations'].append(f'{route}: нет сценария')
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(report, file, ensure_ascii=False, indent=2)
+        if report['violations']:
+            raise CommandError(
+                'Нарушены бюджеты:\n' + '\n'.join(report['violations'])
+            )
+        self.stdout.write(self.style.SUCCESS('Все бюджеты соблюдены.'))
+
+    @staticmethod
+    def request(client, scenario):
+        """Выполняет сценарий; изменения в базе откатываются.
+
+        Возвращает ответ и запросы сценария без управления транзакцией.
+        """
+        with transaction.atomic():
+            with CaptureQueriesContext(connection) as queries:
+                response = getattr(client, scenario.method)(
+                    scenario.path, scenario.data, format='json'
+                )
+                if hasattr(response, 'streaming_content'):
+                    b''.join(response.streaming_content)
+            transaction.set_rollback(True)
+        return response, queries
+
+    def measure(self, client, scenario, repeat):
+        clear_caches()
+        response, cold = self.request(client, scenario)
+        timings = []
+        for _ in range(max(repeat, 1)):
+            start = time.perf_counter()
+            _, warm = self.request(client, scenario)
+            timings.append((time.perf_counter() - start) * 1000)
+        result = {
+            'route': scenario.route,
+            'method': scenario.method.upper(),
+            'path': scenario.path,
+            'status': response.status_code,
+            'queries_cold': len(cold),
+            'queries_warm': len(warm),
+            'budget': scenario.budget,
+            'mean_ms': round(statistics.mean(timings), 3),
+        }
+        for share in PERCENTILES:
+            result[f'p{share}_ms'] = round(percentile(timings, share), 3)
+        return result
+
+    @staticmethod
+    def check_budget(scenario, result, violations):
+        if result['queries_cold'] > scenario.budget:
+            violations.append(
+                f'{scenario.name}: {result["queries_cold"]} запросов '
+                f'при бюджете {scenario.budget}'
+            )
+        if result['status'] >= 500:
+            violations.append(
+                f'{scenario.name}: статус ответа {result["status"]}'
+            )
+
+    def write_result(self, scenario, result, previous):
+        line = (f'{scenario.name} [{result["method"]} {result["status"]}]: '
+                f'p50 {result["p50_ms"]} мс, p99 {result["p99_ms"]} мс, '
+                f'запросов {result["queries_cold"]}/{scenario.budget}')
+        if previous:
+            line += (f' (было p50 {previous["p50_ms"]} мс, '
+                     f'запросов {previous["queries_cold"]})')
+        style = (self.style.ERROR if result['queries_cold'] > scenario.budget
+                 else self.style.MIGRATE_HEADING)
+        self.stdout.write(style(line))
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from recipes.similarity import compute_similar
+
+
+class Command(BaseCommand):
+    help = ('Пересчёт похожих рецептов: изменённых после прошлого запуска '
+            'или всех с --full')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full', action='store_true',
+            help='Пересчитать похожие для всех рецептов'
+        )
+
+    def handle(self, *args, **options):
+        total = compute_similar(full=options['full'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Похожие рецепты пересчитаны: {total}.'
+        ))
@@ -0,0 +1,240 @@
+import random
+from itertools import accumulate, islice
+
+from django.apps import apps
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from api.catalog_cache import CatalogCache
+from foodgram.consts import IMPORT_BATCH_SIZE
+from recipes import feed, shopping_list
+from recipes.counters import recount
+from recipes.models import (FavoriteRecipes, Ingredient, IngredientInRecipes,
+                            Recipe, ShoppingCart, Tag, TagInRecipes)
+from recipes.search import index_recipes
+from recipes.similarity import compute_similar
+from users.models import Follow, User
+
+UNITS = ('г', 'кг', 'мл', 'л', 'шт.', 'ст. л.', 'ч. л.', 'по вкусу')
+INGREDIENTS_PER_RECIPE = (5, 20)
+TAGS_PER_RECIPE = (1, 3)
+PASSWORD = 'benchmark'
+
+
+def popularity(ids):
+    """Накопленные веса для rnd.choices с перекосом к первым id.
+
+    Вес элемента обратно пропорционален его позиции, как в реальных
+    данных: у немногих авторов и рецептов большая часть рецептов,
+    подписчиков и добавлений в избранное.
+    """
+    return list(accumulate(1 / (position + 1) for position in range(len(ids))))
+
+
+def popular(ids, cum_weights, rnd, count):
+    """Случайная выборка count разных id с весами popularity()."""
+    if count >= len(ids):
+        return list(ids)
+    chosen = set()
+    while len(chosen) < count:
+        chosen.update(rnd.choices(
+            ids, cum_weights=cum_weights, k=count - len(chosen)
+        ))
+    return list(chosen)
+
+
+class Command(BaseCommand):
+    help = ('Заполнение базы синтетическими пользователями, рецептами, '
+            'подписками, избранным и корзинами пакетными вставками')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--users', type=int, default=1000,
+            help='Количество новых пользователей'
+        )
+        parser.add_argument(
+            '--recipes', type=int, default=5000,
+            help='Количество новых рецептов'
+        )
+        parser.add_argument(
+            '--tags', type=int, default=8,
+            help='Минимальное количество тегов в базе'
+        )
+        parser.add_argument(
+            '--ingredients', type=int, default=500,
+            help='Минимальное количество ингредиентов в базе'
+        )
+        parser.add_argument(
+            '--follows', type=int, default=10,
+            help='Среднее количество подписок на пользователя'
+        )
+        parser.add_argument(
+            '--favorites', type=int, default=20,
+            help='Среднее количество рецептов в избранном'
+        )
+        parser.add_argument(
+            '--carts', type=int, default=5,
+            help='Среднее количество рецептов в корзине'
+        )
+        parser.add_argument(
+            '--seed', type=int, help='Зерно генератора для повторяемости'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=IMPORT_BATCH_SIZE,
+            help='Количество строк в одной вставке'
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size должен быть больше 0')
+        if options['users'] < 1 or options['recipes'] < 0:
+            raise CommandError('Нужен хотя бы один пользователь')
+        self.rnd = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        prefix = f'bench{self.rnd.getrandbits(32):08x}'
+        with transaction.atomic():
+            tag_ids = self.ensure_tags(options['tags'])
+            ingredient_ids = self.ensure_ingredients(options['ingredients'])
+            user_ids = self.create_users(prefix, options['users'])
+            recipe_ids = self.create_recipes(
+                prefix, user_ids, options['recipes']
+            )
+            self.insert(IngredientInRecipes, self.recipe_ingredients(
+                recipe_ids, ingredient_ids
+            ))
+            self.insert(TagInRecipes, self.recipe_tags(recipe_ids, tag_ids))
+            self.insert(Follow, (
+                Follow(user_id=user_id, author_id=author_id)
+                for user_id, author_id in self.pairs(
+                    user_ids, user_ids, options['follows']
+                )
+                if user_id != author_id
+            ))
+            for model, average in ((FavoriteRecipes, options['favorites']),
+                                   (ShoppingCart, options['carts'])):
+                self.insert(model, (
+                    model(user_id=user_id, recipe_id=recipe_id)
+                    for user_id, recipe_id in self.pairs(
+                        user_ids, recipe_ids, average
+                    )
+                ))
+            recount(apps)
+            index_recipes(apps, recipe_ids)
+            shopping_list.rebuild(apps)
+            feed.rebuild(apps)
+        compute_similar()
+        for catalog in CatalogCache.registry.values():
+            catalog.bump()
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано пользователей: {len(user_ids)}, '
+            f'рецептов: {len(recipe_ids)}. Пароль пользователей '
+            f'{prefix}_*: "{PASSWORD}".'
+        ))
+
+    def insert(self, model, objs):
+        total = 0
+        objs = iter(objs)
+        while True:
+            batch = list(islice(objs, self.batch_size))
+            if not batch:
+                break
+            model.objects.bulk_create(batch, ignore_conflicts=True)
+            total += len(batch)
+        self.stdout.write(f'{model._meta.verbose_name_plural}: {total}')
+
+    def ensure_tags(self, count):
+        existing = Tag.objects.count()
+        self.insert(Tag, (
+            Tag(
+                name=f'Тег {number}',
+                color=f'#{self.rnd.randrange(0x1000000):06X}',
+                slug=f'tag{number}',
+            )
+            for number in range(existing, count)
+        ))
+        return list(Tag.objects.values_list('id', flat=True))
+
+    def ensure_ingredients(self, count):
+        existing = Ingredient.objects.count()
+        self.insert(Ingredient, (
+            Ingredient(
+                name=f'ингредиент {number}',
+                measurement_unit=self.rnd.choice(UNITS),
+            )
+            for number in range(existing, count)
+        ))
+        ingredient_ids = list(Ingredient.objects.values_list('id', flat=True))
+        if len(ingredient_ids) < INGREDIENTS_PER_RECIPE[0]:
+            raise CommandError('Слишком мало ингредиентов для рецептов')
+        return ingredient_ids
+
+    def create_users(self, prefix, count):
+        password = make_password(PASSWORD)
+        self.insert(User, (
+            User(
+                username=f'{prefix}_{number}',
+                email=f'{prefix}_{number}@example.com',
+                first_name='Имя',
+                last_name='Фамилия',
+                password=password,
+            )
+            for number in range(count)
+        ))
+        return list(User.objects.filter(
+            username__startswith=f'{prefix}_'
+        ).order_by('pk').values_list('id', flat=True))
+
+    def create_recipes(self, prefix, user_ids, count):
+        authors = self.rnd.choices(
+            user_ids, cum_weights=popularity(user_ids), k=count
+        )
+        self.insert(Recipe, (
+            Recipe(
+                author_id=authors[number],
+                name=f'{prefix} рецепт {number}',
+                text='Описание рецепта. ' * self.rnd.randint(1, 30),
+                image='recipes/benchmark.png',
+                cooking_time=self.rnd.randint(5, 180),
+            )
+            for number in range(count)
+        ))
+        return list(Recipe.objects.filter(
+            name__startswith=f'{prefix} рецепт '
+        ).order_by('pk').values_list('id', flat=True))
+
+    def recipe_ingredients(self, recipe_ids, ingredient_ids):
+        low, high = INGREDIENTS_PER_RECIPE
+        for recipe_id in recipe_ids:
+            for ingredient_id in self.rnd.sample(
+                ingredient_ids, min(self.rnd.randint(low, high),
+                                    len(ingredient_ids))
+            ):
+                yield IngredientInRecipes(
+                    recipe_id=recipe_id,
+                    ingredient_id=ingredient_id,
+                    amount=self.rnd.randint(1, 1000),
+                )
+
+    def recipe_tags(self, recipe_ids, tag_ids):
+        if not tag_ids:
+            return
+        low, high = TAGS_PER_RECIPE
+        for recipe_id in recipe_ids:
+            for tag_id in self.rnd.sample(
+                tag_ids, min(self.rnd.randint(low, high), len(tag_ids))
+            ):
+                yield TagInRecipes(recipe_id=recipe_id, tag_id=tag_id)
+
+    def pairs(self, user_ids, target_ids, average):
+        """Пары (пользователь, объект) со средним числом average на
+        пользователя и популярными объектами в начале списка."""
+        if not target_ids or average < 1:
+            return
+        cum_weights = popularity(target_ids)
+        for user_id in user_ids:
+            count = self.rnd.randint(0, 2 * average)
+            for target_id in popular(
+                target_ids, cum_weights, self.rnd, count
+            ):
+                yield user_id, target_id
@@ -0,0 +1,171 @@
+import csv
+import json
+import os.path as path
+from collections import namedtuple
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from api.catalog_cache import ingredients_cache, tags_cache
+from foodgram.consts import IMPORT_BATCH_SIZE
+from recipes.models import Ingredient, Tag
+
+Catalog = namedtuple(
+    'Catalog', ('model', 'fields', 'unique_fields', 'update_fields', 'cache')
+)
+
+CATALOGS = {
+    'ingredients': Catalog(
+        model=Ingredient,
+        fields=('name', 'measurement_unit'),
+        unique_fields=('name', 'measurement_unit'),
+        update_fields=(),
+        cache=ingredients_cache,
+    ),
+    'tags': Catalog(
+        model=Tag,
+        fields=('name', 'color', 'slug'),
+        unique_fields=('slug',),
+        update_fields=('name', 'color'),
+        cache=tags_cache,
+    ),
+}
+FORMATS = ('csv', 'json', 'jsonl')
+
+
+class Command(BaseCommand):
+    help = 'Пакетный идемпотентный импорт справочников из CSV/JSON/JSONL'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Путь к файлу с данными')
+        parser.add_argument(
+            '--catalog', choices=CATALOGS, default='ingredients',
+            help='Справочник для импорта'
+        )
+        parser.add_argument(
+            '--format', choices=FORMATS, dest='file_format',
+            help='Формат файла, по умолчанию определяется по расширению'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=IMPORT_BATCH_SIZE,
+            help='Количество строк в одной пачке'
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Посчитать изменения и откатить транзакцию'
+        )
+
+    def handle(self, *args, **options):
+        catalog = CATALOGS[options['catalog']]
+        file_format = (
+            options['file_format']
+            or path.splitext(options['path'])[1].lstrip('.').lower()
+        )
+        if file_format not in FORMATS:
+            raise CommandError(f'Неизвестный формат файла: "{file_format}"')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size должен быть больше 0')
+        try:
+            with open(options['path'], 'r', encoding='utf-8') as file:
+                totals = self.load(
+                    catalog,
+                    self.read_rows(file, file_format, catalog.fields),
+                    options['batch_size'],
+                    options['dry_run'],
+                )
+        except FileNotFoundError:
+            raise CommandError(f'Файл "{options["path"]}" не найден')
+        except (ValueError, csv.Error) as error:
+            raise CommandError(f'Ошибка чтения "{options["path"]}": {error}')
+        self.stdout.write(self.style.SUCCESS(
+            '{}добавлено: {inserted}, обновлено: {updated}, '
+            'пропущено: {skipped}'.format(
+                'Пробный запуск, ' if options['dry_run'] else '', **totals
+            )
+        ))
+
+    @staticmethod
+    def read_rows(file, file_format, fields):
+        if file_format == 'csv':
+            for row in csv.reader(file):
+                yield dict(zip(fields, row))
+        elif file_format == 'jsonl':
+            for line in file:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from json.load(file)
+
+    def load(self, catalog, rows, batch_size, dry_run):
+        totals = {'inserted': 0, 'updated': 0, 'skipped': 0}
+        processed = 0
+        with transaction.atomic():
+            while True:
+                batch = list(islice(rows, batch_size))
+                if not batch:
+                    break
+                for key, value in self.load_batch(catalog, batch).items():
+                    totals[key] += value
+                processed += len(batch)
+                self.stdout.write(f'Обработано строк: {processed}')
+            if dry_run:
+                transaction.set_rollback(True)
+        if not dry_run and (totals['inserted'] or totals['updated']):
+            catalog.cache.bump()
+        return totals
+
+    @staticmethod
+    def load_batch(catalog, batch):
+        model, unique_fields = catalog.model, catalog.unique_fields
+        counts = {'inserted': 0, 'updated': 0, 'skipped': 0}
+        rows = {}
+        for row in batch:
+            values = {
+                field: str(row.get(field) or '').strip()
+                for field in catalog.fields
+            }
+            key = tuple(values[field] for field in unique_fields)
+            if not all(key) or key in rows:
+                counts['skipped'] += 1
+                continue
+            rows[key] = values
+        existing = {
+            tuple(getattr(obj, field) for field in unique_fields): obj
+            for obj in model.objects.filter(**{
+                f'{unique_fields[0]}__in': {key[0] for key in rows}
+            })
+        }
+        to_create, to_update = [], []
+        for key, values in rows.items():
+            obj = existing.get(key)
+            if obj is None:
+                to_create.append(model(**values))
+                continue
+            changed = [
+                field for field in catalog.update_fields
+                if getattr(obj, field) != values[field]
+            ]
+            if not changed:
+                counts['skipped'] += 1
+                continue
+            for field in changed:
+                setattr(obj, field, values[field])
+            to_update.append(obj)
+        if to_create:
+            # ignore_conflicts молча отбрасывает строки, конфликтующие по
+            # другим уникальным полям, поэтому добавленные считаются по БД.
+            created = model.objects.filter(**{
+                f'{unique_fields[0]}__in': {
+                    getattr(obj, unique_fields[0]) for obj in to_create
+                }
+            })
+            before = created.count()
+            model.objects.bulk_create(to_create, ignore_conflicts=True)
+            inserted = created.count() - before
+            counts['inserted'] += inserted
+            counts['skipped'] += len(to_create) - inserted
+        if to_update:
+            model.objects.bulk_update(to_update, catalog.update_fields)
+        counts['updated'] += len(to_update)
+        return counts
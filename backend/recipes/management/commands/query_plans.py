@@ -0,0 +1,115 @@
+import json
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from django.test import RequestFactory
+from rest_framework.request import Request
+
+from api.filters import RecipeFilter
+from api.views import RecipeViewSet
+from recipes.models import Tag
+from users.models import User
+
+PAGE_SIZE = 6
+
+
+def recipe_list(user, **params):
+    """Кверисет списка рецептов так, как его строят RecipeViewSet
+    и RecipeFilter для запроса с параметрами params."""
+    request = Request(RequestFactory().get('/api/recipes/', params))
+    request.user = user
+    view = RecipeViewSet(
+        request=request, action='list', format_kwarg=None, kwargs={}
+    )
+    return RecipeFilter(
+        request.query_params, queryset=view.get_queryset(), request=request
+    ).qs
+
+
+def access_paths():
+    """Запросы фильтров RecipeFilter, выгрузки корзины и подписок."""
+    user = User.objects.annotate(
+        activity=Count('favorites') + Count('shopping_cart')
+    ).order_by('-activity').first()
+    author = User.objects.order_by('-recipes_count').first()
+    tags = list(Tag.objects.values_list('slug', flat=True)[:2])
+    if user is None or author is None or not tags:
+        raise CommandError(
+            'В базе нет данных: сначала заполните её тестовым набором.'
+        )
+    return {
+        'recipes_by_tags': recipe_list(user, tags=tags),
+        'recipes_by_author': recipe_list(user, author=author.pk),
+        'favorited_by_user': recipe_list(user, is_favorited=1),
+        'in_shopping_cart': recipe_list(user, is_in_shopping_cart=1),
+        'shopping_cart_totals': RecipeViewSet.get_shopping_list(user),
+        'subscriptions': User.objects.filter(
+            following__user=user
+        ).order_by('username'),
+    }
+
+
+class Command(BaseCommand):
+    help = ('Планы выполнения и время запросов по основным путям доступа. '
+            'Сравнение до/после: запустите с --output до миграции '
+            'и с --compare после неё.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--repeat', type=int, default=20,
+            help='Количество повторов каждого запроса'
+        )
+        parser.add_argument(
+            '--output', help='Сохранить отчёт в JSON-файл'
+        )
+        parser.add_argument(
+            '--compare', help='JSON-отчёт предыдущего запуска для сравнения'
+        )
+        parser.add_argument(
+            '--no-plans', action='store_true',
+            help='Не выводить планы выполнения'
+        )
+
+    def handle(self, *args, **options):
+        previous = {}
+        if options['compare']:
+            with open(options['compare'], encoding='utf-8') as file:
+                previous = json.load(file)
+        report = {}
+        for name, queryset in access_paths().items():
+            queryset = queryset[:PAGE_SIZE]
+            timings = []
+            for _ in range(max(options['repeat'], 1)):
+                start = time.perf_counter()
+                list(queryset.all())
+                timings.append((time.perf_counter() - start) * 1000)
+            report[name] = {
+                'plan': queryset.explain(),
+                'median_ms': round(statistics.median(timings), 3),
+                'max_ms': round(max(timings), 3),
+            }
+            self.write_result(name, report[name], previous.get(name),
+                              options['no_plans'])
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(report, file, ensure_ascii=False, indent=2)
+
+    def write_result(self, name, result, previous, no_plans):
+        line = (f'{name}: медиана {result["median_ms"]} мс, '
+                f'максимум {result["max_ms"]} мс')
+        if previous:
+            line += f' (было {previous["median_ms"]} мс)'
+        self.stdout.write(self.style.MIGRATE_HEADING(line))
+        if no_plans:
+            return
+        if previous and previous['plan'] != result['plan']:
+            self.stdout.write('  план до:')
+            self.stdout.write(self.indent(previous['plan']))
+            self.stdout.write('  план после:')
+        self.stdout.write(self.indent(result['plan']))
+
+    @staticmethod
+    def indent(text):
+        return '\n'.join(f'    {line}' for line in text.splitlines())
@@ -0,0 +1,14 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipes.feed import rebuild
+
+
+class Command(BaseCommand):
+    help = 'Пересборка лент подписок по подпискам и рецептам авторов'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            rebuild(apps)
+        self.stdout.write(self.style.SUCCESS('Ленты подписок пересобраны.'))
@@ -0,0 +1,14 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipes.shopping_list import rebuild
+
+
+class Command(BaseCommand):
+    help = 'Пересборка списков покупок пользователей по их корзинам'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            rebuild(apps)
+        self.stdout.write(self.style.SUCCESS('Списки покупок пересобраны.'))
@@ -0,0 +1,114 @@
+# Generated by Django 3.2.16 on 2026-10-18 18:12
+
+import django.contrib.postgres.search
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+from django.db.models import OuterRef, Subquery
+
+FTS_TABLE = 'recipes_recipe_fts'
+FTS_WEIGHTS = (10.0, 5.0, 1.0)
+SEARCH_CONFIG = 'russian'
+BATCH_SIZE = 500
+YO_SQL = "replace(replace({}, 'ё', 'е'), 'Ё', 'Е')"
+
+POSTGRESQL_INDEXES = (
+    'CREATE INDEX IF NOT EXISTS recipes_recipe_search_vector_gin '
+    'ON recipes_recipe USING gin (search_vector)',
+)
+POSTGRESQL_DROP_INDEXES = (
+    'DROP INDEX IF EXISTS recipes_recipe_search_vector_gin',
+)
+SQLITE_INDEXES = (
+    f'CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5('
+    f'name, ingredients, text, tokenize = "unicode61")',
+    f'INSERT INTO {FTS_TABLE} ({FTS_TABLE}, rank) '
+    f'VALUES (\'rank\', \'bm25({", ".join(map(str, FTS_WEIGHTS))})\')',
+)
+SQLITE_DROP_INDEXES = (
+    f'DROP TABLE IF EXISTS {FTS_TABLE}',
+)
+
+
+def search_vector(apps):
+    ingredient_names = Subquery(
+        apps.get_model('recipes', 'IngredientInRecipes').objects.filter(
+            recipe=OuterRef('pk')
+        ).order_by().values('recipe').annotate(
+            names=StringAgg('ingredient__name', ' ')
+        ).values('names')
+    )
+    return (
+        SearchVector('name', weight='A', config=SEARCH_CONFIG)
+        + SearchVector(ingredient_names, weight='B', config=SEARCH_CONFIG)
+        + SearchVector('text', weight='C', config=SEARCH_CONFIG)
+    )
+
+
+def index_recipes(apps, schema_editor):
+    """Заполняет индекс пачками; код заморожен на момент миграции."""
+    recipe = apps.get_model('recipes', 'Recipe')
+    using = schema_editor.connection.alias
+    recipe_ids = list(recipe.objects.using(using).order_by(
+        'pk'
+    ).values_list('pk', flat=True))
+    for start in range(0, len(recipe_ids), BATCH_SIZE):
+        chunk = recipe_ids[start:start + BATCH_SIZE]
+        if schema_editor.connection.vendor == 'postgresql':
+            recipe.objects.using(using).filter(pk__in=chunk).update(
+                search_vector=search_vector(apps)
+            )
+            continue
+        placeholders = ', '.join(['%s'] * len(chunk))
+        schema_editor.execute(
+            f'INSERT INTO {FTS_TABLE} (rowid, name, ingredients, text) '
+            f'SELECT r.id, {YO_SQL.format("r.name")}, COALESCE(('
+            f'SELECT {YO_SQL.format("group_concat(i.name, char(32))")} '
+            f'FROM recipes_ingredientinrecipes ir '
+            f'JOIN recipes_ingredient i ON i.id = ir.ingredient_id '
+            f'WHERE ir.recipe_id = r.id), \'\'), '
+            f'{YO_SQL.format("r.text")} '
+            f'FROM recipes_recipe r WHERE r.id IN ({placeholders})',
+            chunk
+        )
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        statements = POSTGRESQL_INDEXES
+    elif vendor == 'sqlite':
+        statements = SQLITE_INDEXES
+    else:
+        return
+    for sql in statements:
+        schema_editor.execute(sql)
+    index_recipes(apps, schema_editor)
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        statements = POSTGRESQL_DROP_INDEXES
+    elif vendor == 'sqlite':
+        statements = SQLITE_DROP_INDEXES
+    else:
+        return
+    for sql in statements:
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0009_recipe_name_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True, verbose_name='Поисковый вектор'),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
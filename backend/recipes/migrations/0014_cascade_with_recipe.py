@@ -0,0 +1,24 @@
+# Generated by Django 3.2.16 on 2026-10-18 18:35
+
+from django.db import migrations, models
+import recipes.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0013_similar_recipes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='favoriterecipes',
+            name='recipe',
+            field=models.ForeignKey(on_delete=recipes.models.cascade_with_recipe, related_name='favorites', to='recipes.recipe', verbose_name='Рецепт'),
+        ),
+        migrations.AlterField(
+            model_name='shoppingcart',
+            name='recipe',
+            field=models.ForeignKey(on_delete=recipes.models.cascade_with_recipe, related_name='shopping_cart', to='recipes.recipe', verbose_name='Рецепт'),
+        ),
+    ]
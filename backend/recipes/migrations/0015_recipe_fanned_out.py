@@ -0,0 +1,30 @@
+# Generated by Django 3.2.16 on 2026-10-18 18:40
+
+from django.db import migrations, models
+
+# Рецепты авторов меньше чем с 10000 подписчиков уже разосланы по лентам
+# (0012_feed), остальные лента читает из рецептов.
+MARK_FANNED_OUT = (
+    'UPDATE recipes_recipe SET fanned_out = author_id IN ('
+    'SELECT id FROM users_user WHERE followers_count < 10000)'
+)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0014_cascade_with_recipe'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='fanned_out',
+            field=models.BooleanField(default=False, editable=False, verbose_name='Разослан по лентам подписчиков'),
+        ),
+        migrations.RunSQL(MARK_FANNED_OUT, migrations.RunSQL.noop),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(condition=models.Q(('fanned_out', False)), fields=['author', '-pub_date', '-id'], name='recipe_not_fanned_out_idx'),
+        ),
+    ]
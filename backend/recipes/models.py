@@ -1,6 +1,8 @@
 from colorfield.fields import ColorField
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
+from django.db.models import Exists, OuterRef, Prefetch, Q, Value
 
 from foodgram.consts import (INGREDIENT_MAX_AMOUNT, MIN_NUM,
                              RECIPES_MAX_LENGTH, TWENTY_FOUR_HOURS)
@@ -65,6 +67,42 @@ class Tag(models.Model):
         return self.name
 
 
+class RecipeQuerySet(models.QuerySet):
+    """Кверисет рецептов с аннотациями для текущего пользователя."""
+
+    def with_user_flags(self, user):
+        if not user.is_authenticated:
+            return self.annotate(
+                is_favorited=Value(False, output_field=models.BooleanField()),
+                is_in_shopping_cart=Value(
+                    False, output_field=models.BooleanField()
+                ),
+            )
+        return self.annotate(
+            is_favorited=Exists(FavoriteRecipes.objects.filter(
+                user=user, recipe=OuterRef('pk')
+            )),
+            is_in_shopping_cart=Exists(ShoppingCart.objects.filter(
+                user=user, recipe=OuterRef('pk')
+            )),
+        )
+
+    def with_related(self, user):
+        return self.prefetch_related(
+            Prefetch(
+                'author',
+                queryset=User.objects.with_is_subscribed(user)
+            ),
+            'tags',
+            Prefetch(
+                'ingredient_list',
+                queryset=IngredientInRecipes.objects.select_related(
+                    'ingredient'
+                ).order_by('pk')
+            ),
+        )
+
+
 class Recipe(models.Model):
     """Модель для рецептов."""
     author = models.ForeignKey(
@@ -84,6 +122,12 @@ class Recipe(models.Model):
         verbose_name='Фото готового блюда',
         upload_to='recipes/',
     )
+    image_renditions = models.JSONField(
+        verbose_name='Уменьшенные копии фото',
+        default=dict,
+        blank=True,
+        editable=False,
+    )
     ingredients = models.ManyToManyField(
         Ingredient,
         verbose_name='Ингридиенты',
@@ -112,11 +156,49 @@ class Recipe(models.Model):
         auto_now_add=True,
         editable=False,
     )
+    favorites_count = models.PositiveIntegerField(
+        'Количество добавлений в избранное',
+        default=0,
+        editable=False,
+    )
+    search_vector = SearchVectorField(
+        'Поисковый вектор',
+        null=True,
+        editable=False,
+    )
+    similar_stale = models.BooleanField(
+        'Похожие рецепты нужно пересчитать',
+        default=True,
+        editable=False,
+        db_index=True,
+    )
+    fanned_out = models.BooleanField(
+        'Разослан по лентам подписчиков',
+        default=False,
+        editable=False,
+    )
+
+    objects = RecipeQuerySet.as_manager()
 
     class Meta:
         ordering = ('-pub_date',)
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
+        indexes = [
+            models.Index(
+                fields=('-pub_date', '-id'),
+                name='recipe_pub_date_id_idx'
+            ),
+            models.Index(
+                fields=('author', '-pub_date'),
+                name='recipe_author_pub_date_idx'
+            ),
+            models.Index(
+                fields=('author', '-pub_date', '-id'),
+                name='recipe_not_fanned_out_idx',
+                condition=Q(fanned_out=False),
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -149,7 +231,6 @@ class IngredientInRecipes(models.Model):
     )
 
     class Meta:
-        ordering = ('ingredient', 'recipe', )
         verbose_name = 'Ингредиент в рецепте'
         verbose_name_plural = 'Ингредиенты в рецептах'
         constraints = [
@@ -182,11 +263,28 @@ class TagInRecipes(models.Model):
     class Meta:
         verbose_name = 'Тег в рецептах'
         verbose_name_plural = 'Теги в рецептах'
+        constraints = [
+            models.UniqueConstraint(
+                fields=('tag', 'recipe'),
+                name='unique_tag_recipe'
+            )
+        ]
 
     def __str__(self):
         return f'{self.recipe} - {self.tag}'
 
 
+def cascade_with_recipe(collector, field, sub_objs, using):
+    """CASCADE, помечающий строки, которые удаляются вместе с рецептом.
+
+    Обработчики сигналов таких строк пропускают работу, которую один раз
+    выполняет обработчик удаления самого рецепта.
+    """
+    for obj in sub_objs:
+        obj.deleted_with_recipe = True
+    models.CASCADE(collector, field, sub_objs, using)
+
+
 class FavoriteAndSnoppingCart(models.Model):
     """Абстрактная модель для избранных рецептов и корзины."""
 
@@ -198,7 +296,7 @@ class FavoriteAndSnoppingCart(models.Model):
     recipe = models.ForeignKey(
         Recipe,
         verbose_name='Рецепт',
-        on_delete=models.CASCADE,
+        on_delete=cascade_with_recipe,
     )
 
     class Meta:
@@ -231,6 +329,134 @@ class ShoppingCart(FavoriteAndSnoppingCart):
         default_related_name = 'shopping_cart'
         verbose_name = 'Покупка'
         verbose_name_plural = 'Покупки'
+        constraints = [
+            models.UniqueConstraint(
+                fields=('user', 'recipe'),
+                name='unique_user_shopping_cart_recipe'
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.user} - {self.recipe}'
+
+
+class ShoppingListItem(models.Model):
+    """Сумма ингредиента по всем рецептам в корзине пользователя.
+
+    Поддерживается изменениями на разницу (recipes.shopping_list),
+    поэтому список покупок читается без агрегации по корзине.
+    """
+
+    user = models.ForeignKey(
+        User,
+        verbose_name='Пользователь',
+        on_delete=models.CASCADE,
+        related_name='shopping_list',
+        db_index=False,
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        verbose_name='Ингредиент',
+        on_delete=models.CASCADE,
+        related_name='shopping_list_items',
+    )
+    amount = models.IntegerField(
+        verbose_name='Количество',
+        default=0,
+    )
+
+    class Meta:
+        verbose_name = 'Ингредиент в списке покупок'
+        verbose_name_plural = 'Списки покупок'
+        constraints = [
+            models.UniqueConstraint(
+                fields=('user', 'ingredient'),
+                name='unique_user_shopping_list_ingredient'
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.user} - {self.ingredient}: {self.amount}'
+
+
+class FeedEntry(models.Model):
+    """Рецепт в ленте подписок пользователя.
+
+    Дата публикации копируется из рецепта, чтобы страница ленты
+    читалась по одному индексу (user, -pub_date, -recipe).
+    """
+
+    user = models.ForeignKey(
+        User,
+        verbose_name='Подписчик',
+        on_delete=models.CASCADE,
+        related_name='feed',
+        db_index=False,
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        verbose_name='Рецепт',
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+    )
+    pub_date = models.DateTimeField('Дата публикации')
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Ленты подписок'
+        constraints = [
+            models.UniqueConstraint(
+                fields=('user', 'recipe'),
+                name='unique_user_feed_recipe'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=('user', '-pub_date', '-recipe'),
+                name='feed_user_pub_date_idx'
+            ),
+        ]
 
     def __str__(self):
         return f'{self.user} - {self.recipe}'
+
+
+class SimilarRecipe(models.Model):
+    """Похожий рецепт из заранее посчитанных K ближайших.
+
+    Заполняется командой compute_similar (recipes.similarity).
+    """
+
+    recipe = models.ForeignKey(
+        Recipe,
+        verbose_name='Рецепт',
+        on_delete=models.CASCADE,
+        related_name='similar_recipes',
+        db_index=False,
+    )
+    similar = models.ForeignKey(
+        Recipe,
+        verbose_name='Похожий рецепт',
+        on_delete=models.CASCADE,
+        related_name='similar_to',
+    )
+    score = models.FloatField('Сходство')
+
+    class Meta:
+        verbose_name = 'Похожий рецепт'
+        verbose_name_plural = 'Похожие рецепты'
+        constraints = [
+            models.UniqueConstraint(
+                fields=('recipe', 'similar'),
+                name='unique_similar_recipe'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=('recipe', '-score'),
+                name='similar_recipe_score_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.recipe} - {self.similar}: {self.score:.3f}'
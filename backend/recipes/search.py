@@ -0,0 +1,90 @@
+from itertools import islice
+
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import SearchVector
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models import OuterRef, Subquery
+
+from foodgram.consts import RECIPE_SEARCH_CONFIG, SEARCH_INDEX_BATCH_SIZE
+
+FTS_TABLE = 'recipes_recipe_fts'
+FTS_WEIGHTS = (10.0, 5.0, 1.0)
+YO_SQL = "replace(replace({}, 'ё', 'е'), 'Ё', 'Е')"
+
+
+def chunked(ids, size):
+    ids = iter(ids)
+    while True:
+        chunk = list(islice(ids, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def search_vector(models):
+    """Вектор рецепта: название (A), ингредиенты (B) и описание (C)."""
+    ingredient_in_recipes = models.get_model(
+        'recipes', 'IngredientInRecipes'
+    )
+    ingredient_names = Subquery(
+        ingredient_in_recipes.objects.filter(
+            recipe=OuterRef('pk')
+        ).order_by().values('recipe').annotate(
+            names=StringAgg('ingredient__name', ' ')
+        ).values('names')
+    )
+    return (
+        SearchVector('name', weight='A', config=RECIPE_SEARCH_CONFIG)
+        + SearchVector(ingredient_names, weight='B',
+                       config=RECIPE_SEARCH_CONFIG)
+        + SearchVector('text', weight='C', config=RECIPE_SEARCH_CONFIG)
+    )
+
+
+def index_sqlite(models, recipe_ids, using):
+    """Токенизатор unicode61 не снимает диакритику с кириллицы,
+    поэтому ё в индексе и в запросе заменяется на е."""
+    tables = {
+        name: models.get_model('recipes', name)._meta.db_table
+        for name in ('Recipe', 'Ingredient', 'IngredientInRecipes')
+    }
+    placeholders = ', '.join(['%s'] * len(recipe_ids))
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})',
+            recipe_ids
+        )
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE} (rowid, name, ingredients, text) '
+            f'SELECT r.id, {YO_SQL.format("r.name")}, COALESCE(('
+            f'SELECT {YO_SQL.format("group_concat(i.name, char(32))")} '
+            f'FROM {tables["IngredientInRecipes"]} ir '
+            f'JOIN {tables["Ingredient"]} i ON i.id = ir.ingredient_id '
+            f'WHERE ir.recipe_id = r.id), \'\'), '
+            f'{YO_SQL.format("r.text")} '
+            f'FROM {tables["Recipe"]} r WHERE r.id IN ({placeholders})',
+            recipe_ids
+        )
+
+
+def index_recipes(models, recipe_ids=None, using=DEFAULT_DB_ALIAS):
+    """Пересчитывает поисковый индекс рецептов recipe_ids (всех при None).
+
+    На PostgreSQL обновляется колонка search_vector с GIN-индексом,
+    на SQLite - таблица FTS5 recipes_recipe_fts. Рецепты обрабатываются
+    пачками, по одному UPDATE (или DELETE и INSERT) на пачку.
+    models - реестр моделей: django.apps.apps или apps из миграции.
+    """
+    recipe = models.get_model('recipes', 'Recipe')
+    if recipe_ids is None:
+        recipe_ids = list(recipe.objects.using(using).order_by(
+            'pk'
+        ).values_list('pk', flat=True))
+    vendor = connections[using].vendor
+    for chunk in chunked(recipe_ids, SEARCH_INDEX_BATCH_SIZE):
+        if vendor == 'postgresql':
+            recipe.objects.using(using).filter(pk__in=chunk).update(
+                search_vector=search_vector(models)
+            )
+        else:
+            index_sqlite(models, chunk, using)
@@ -0,0 +1,105 @@
+from django.db import DEFAULT_DB_ALIAS, connections
+
+UPSERT = (
+    'INSERT INTO {list} (user_id, ingredient_id, amount) {select} '
+    'ON CONFLICT (user_id, ingredient_id) '
+    'DO UPDATE SET amount = {list}.amount + excluded.amount'
+)
+CLEANUP = 'DELETE FROM {list} WHERE amount <= 0 AND user_id IN ({users})'
+
+
+def tables(models):
+    return {
+        name: models.get_model('recipes', model)._meta.db_table
+        for name, model in (
+            ('list', 'ShoppingListItem'),
+            ('cart', 'ShoppingCart'),
+            ('through', 'IngredientInRecipes'),
+        )
+    }
+
+
+def apply(models, using, select, params, cleanup=None):
+    """Прибавляет к спискам покупок строки (user_id, ingredient_id, delta).
+
+    Отрицательная разница вычитается одним upsert. cleanup - пара
+    (SQL id пользователей, параметры): их обнулившиеся строки удаляются,
+    если upsert что-то изменил.
+    """
+    names = tables(models)
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            UPSERT.format(select=select.format(**names), **names), params
+        )
+        if cleanup is not None and cursor.rowcount:
+            users, users_params = cleanup
+            cursor.execute(
+                CLEANUP.format(users=users.format(**names), **names),
+                users_params
+            )
+
+
+def carts_of(recipe_id):
+    return 'SELECT user_id FROM {cart} WHERE recipe_id = %s', (recipe_id,)
+
+
+def add_recipe(models, user_id, recipe_id, sign=1, using=DEFAULT_DB_ALIAS):
+    """Добавляет рецепт в список покупок пользователя (sign=-1 - убирает)."""
+    apply(
+        models, using,
+        'SELECT %s, ingredient_id, %s * amount FROM {through} '
+        'WHERE recipe_id = %s',
+        (user_id, sign, recipe_id),
+        cleanup=('%s', (user_id,)) if sign < 0 else None,
+    )
+
+
+def add_recipe_to_carts(models, recipe_id, sign=1, using=DEFAULT_DB_ALIAS):
+    """Добавляет рецепт в списки всех, у кого он в корзине."""
+    apply(
+        models, using,
+        'SELECT c.user_id, i.ingredient_id, %s * i.amount FROM {cart} c '
+        'JOIN {through} i ON i.recipe_id = c.recipe_id '
+        'WHERE c.recipe_id = %s',
+        (sign, recipe_id),
+        cleanup=carts_of(recipe_id) if sign < 0 else None,
+    )
+
+
+def change_recipe(models, recipe_id, deltas, using=DEFAULT_DB_ALIAS):
+    """Переносит изменения ингредиентов рецепта в списки покупок.
+
+    deltas - {ingredient_id: разница количества} одного рецепта.
+    """
+    deltas = [(pk, delta) for pk, delta in deltas.items() if delta]
+    if not deltas:
+        return
+    values = ' UNION ALL '.join(
+        ['SELECT %s AS ingredient_id, %s AS amount'] * len(deltas)
+    )
+    apply(
+        models, using,
+        f'SELECT c.user_id, d.ingredient_id, d.amount FROM {{cart}} c, '
+        f'({values}) d WHERE c.recipe_id = %s',
+        [value for delta in deltas for value in delta] + [recipe_id],
+        cleanup=(
+            carts_of(recipe_id)
+            if any(delta < 0 for _, delta in deltas) else None
+        ),
+    )
+
+
+def rebuild(models, using=DEFAULT_DB_ALIAS):
+    """Пересобирает списки покупок всех пользователей по корзинам.
+
+    models - реестр моделей: django.apps.apps или apps из миграции.
+    """
+    names = tables(models)
+    with connections[using].cursor() as cursor:
+        cursor.execute('DELETE FROM {list}'.format(**names))
+        cursor.execute(
+            'INSERT INTO {list} (user_id, ingredient_id, amount) '
+            'SELECT c.user_id, i.ingredient_id, SUM(i.amount) FROM {cart} c '
+            'JOIN {through} i ON i.recipe_id = c.recipe_id '
+            'GROUP BY c.user_id, i.ingredient_id'.format(**names)
+        )
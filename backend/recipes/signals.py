@@ -0,0 +1,120 @@
+from django.apps import apps
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from recipes.counters import change_counter
+from recipes.feed import backfill, feed_fanout, prune
+from recipes.models import (FavoriteRecipes, Ingredient, IngredientInRecipes,
+                            Recipe, ShoppingCart)
+from recipes.search import index_recipes
+from recipes.shopping_list import add_recipe, add_recipe_to_carts
+from users.models import Follow, User
+
+SEARCH_FIELDS = {'name', 'text'}
+
+
+@receiver(post_save, sender=Recipe)
+def increment_recipes_count(instance, created, **kwargs):
+    if created:
+        change_counter(
+            User.objects.filter(pk=instance.author_id), 'recipes_count', 1
+        )
+
+
+@receiver(post_delete, sender=Recipe)
+def decrement_recipes_count(instance, **kwargs):
+    change_counter(
+        User.objects.filter(pk=instance.author_id), 'recipes_count', -1
+    )
+
+
+@receiver(post_save, sender=FavoriteRecipes)
+def increment_favorites_count(instance, created, **kwargs):
+    if created:
+        change_counter(
+            Recipe.objects.filter(pk=instance.recipe_id), 'favorites_count', 1
+        )
+
+
+@receiver(post_delete, sender=FavoriteRecipes)
+def decrement_favorites_count(instance, **kwargs):
+    """Счётчик удаляемого вместе с избранным рецепта не меняется."""
+    if getattr(instance, 'deleted_with_recipe', False):
+        return
+    change_counter(
+        Recipe.objects.filter(pk=instance.recipe_id), 'favorites_count', -1
+    )
+
+
+@receiver(post_save, sender=Recipe)
+def reindex_recipe(instance, created, raw, using, update_fields, **kwargs):
+    """Название и описание попадают в поисковый индекс при сохранении.
+
+    Новый рецепт индексируется после добавления ингредиентов:
+    RecipeWriteSerializer.create и RecipeAdmin.save_related.
+    """
+    if created or raw:
+        return
+    if update_fields and not SEARCH_FIELDS & set(update_fields):
+        return
+    index_recipes(apps, [instance.pk], using=using)
+
+
+@receiver(post_save, sender=Ingredient)
+def reindex_ingredient_recipes(instance, created, raw, using, **kwargs):
+    if created or raw:
+        return
+    recipe_ids = IngredientInRecipes.objects.using(using).filter(
+        ingredient=instance
+    ).values_list('recipe_id', flat=True)
+    index_recipes(apps, recipe_ids, using=using)
+
+
+@receiver(post_save, sender=ShoppingCart)
+def add_to_shopping_list(instance, created, raw, using, **kwargs):
+    if created and not raw:
+        add_recipe(apps, instance.user_id, instance.recipe_id, using=using)
+
+
+@receiver(pre_delete, sender=ShoppingCart)
+def remove_from_shopping_list(instance, using, **kwargs):
+    """Корзины удаляемого рецепта обрабатывает remove_from_shopping_lists."""
+    if getattr(instance, 'deleted_with_recipe', False):
+        return
+    add_recipe(
+        apps, instance.user_id, instance.recipe_id, sign=-1, using=using
+    )
+
+
+@receiver(pre_delete, sender=Recipe)
+def remove_from_shopping_lists(instance, using, **kwargs):
+    """Убирает рецепт из списков покупок всех корзин одним upsert.
+
+    До удаления: ингредиенты и корзины рецепта ещё на месте.
+    """
+    add_recipe_to_carts(apps, instance.pk, sign=-1, using=using)
+
+
+@receiver(post_save, sender=Recipe)
+def fan_out_recipe(instance, created, raw, **kwargs):
+    if created and not raw:
+        feed_fanout.schedule(instance.pk)
+
+
+@receiver(post_save, sender=Follow)
+def backfill_feed(instance, created, raw, **kwargs):
+    if created and not raw:
+        backfill(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def prune_feed(instance, **kwargs):
+    prune(instance.user_id, instance.author_id)
+
+
+@receiver(pre_delete, sender=Recipe)
+def mark_similar_stale(instance, using, **kwargs):
+    """Рецепты, у которых удаляемый был похожим, пересчитываются."""
+    Recipe.objects.using(using).filter(
+        similar_recipes__similar=instance
+    ).update(similar_stale=True)
@@ -0,0 +1,190 @@
+import numpy as np
+from django.db import transaction
+from django.db.models import Count, Min
+from scipy import sparse
+
+from foodgram.consts import (SIMILAR_RECIPES_LIMIT, SIMILAR_TAG_BOOST,
+                             SIMILARITY_BATCH_SIZE)
+from recipes.models import (IngredientInRecipes, Recipe, SimilarRecipe,
+                            TagInRecipes)
+from recipes.search import chunked
+
+
+def jaccard(intersection, sizes, rows, columns):
+    """Коэффициент Жаккара по размеру пересечения и размерам множеств."""
+    union = sizes[rows] + sizes[columns] - intersection
+    return np.divide(
+        intersection, union, out=np.zeros_like(intersection),
+        where=union > 0
+    )
+
+
+class RecipeMatrix:
+    """Разреженные матрицы рецепт x ингредиент и рецепт x тег.
+
+    Строка матрицы - рецепт в порядке id, значения - единицы.
+    Пересечения множеств считаются произведением матриц.
+    """
+
+    def __init__(self):
+        self.ids = np.fromiter(
+            Recipe.objects.order_by('pk').values_list('pk', flat=True),
+            dtype=np.int64,
+        )
+        self.ingredients = self.incidence(
+            IngredientInRecipes.objects.values_list(
+                'recipe_id', 'ingredient_id'
+            )
+        )
+        self.tags = self.incidence(
+            TagInRecipes.objects.values_list('recipe_id', 'tag_id')
+        )
+        self.ingredient_sizes = self.sizes(self.ingredients)
+        self.tag_sizes = self.sizes(self.tags)
+
+    def positions(self, recipe_ids):
+        """Номера строк рецептов; рецепты не из матрицы отбрасываются."""
+        recipe_ids = np.asarray(recipe_ids, dtype=np.int64)
+        if not len(self.ids):
+            return np.array([], dtype=np.int64)
+        positions = np.searchsorted(self.ids, recipe_ids)
+        positions[positions == len(self.ids)] = 0
+        return positions[self.ids[positions] == recipe_ids]
+
+    def incidence(self, pairs):
+        pairs = np.array(list(pairs), dtype=np.int64).reshape(-1, 2)
+        rows = np.searchsorted(self.ids, pairs[:, 0])
+        known = rows < len(self.ids)
+        known[known] = self.ids[rows[known]] == pairs[known, 0]
+        columns = np.unique(pairs[known, 1], return_inverse=True)[1]
+        return sparse.csr_matrix(
+            (np.ones(known.sum(), dtype=np.float64),
+             (rows[known], columns)),
+            shape=(len(self.ids), columns.max() + 1 if len(columns) else 0),
+        )
+
+    @staticmethod
+    def sizes(matrix):
+        return np.asarray(matrix.sum(axis=1), dtype=np.float64).ravel()
+
+    def scores(self, positions):
+        """Сходство рецептов positions со всеми рецептами.
+
+        Возвращает CSR-матрицу len(positions) x n: Жаккар по
+        ингредиентам плюс SIMILAR_TAG_BOOST x Жаккар по тегам.
+        Кандидаты - только рецепты с общими ингредиентами.
+        """
+        common = (
+            self.ingredients[positions] @ self.ingredients.T
+        ).tocoo()
+        rows, columns = common.row, common.col
+        sources = positions[rows]
+        score = jaccard(
+            common.data, self.ingredient_sizes, sources, columns
+        )
+        common_tags = np.asarray(
+            self.tags[sources].multiply(self.tags[columns]).sum(axis=1),
+            dtype=np.float64,
+        ).ravel()
+        score += SIMILAR_TAG_BOOST * jaccard(
+            common_tags, self.tag_sizes, sources, columns
+        )
+        score[sources == columns] = 0
+        result = sparse.csr_matrix(
+            (score, (rows, columns)), shape=(len(positions), len(self.ids))
+        )
+        result.eliminate_zeros()
+        return result
+
+    def neighbours(self, positions, limit=SIMILAR_RECIPES_LIMIT):
+        """Для каждого рецепта - limit самых похожих (id, сходство)."""
+        scores = self.scores(positions)
+        for row, position in enumerate(positions):
+            start, end = scores.indptr[row], scores.indptr[row + 1]
+            columns = scores.indices[start:end]
+            values = scores.data[start:end]
+            if len(values) > limit:
+                top = np.argpartition(-values, limit)[:limit]
+                columns, values = columns[top], values[top]
+            order = np.lexsort((self.ids[columns], -values))
+            yield int(self.ids[position]), list(zip(
+                self.ids[columns[order]].tolist(), values[order].tolist()
+            ))
+
+
+def affected_positions(matrix, changed):
+    """Рецепты, чей список похожих мог измениться из-за changed.
+
+    Это сами changed, рецепты, в списке которых есть changed, и
+    рецепты, для которых новое сходство с changed выше худшего
+    в их списке (или список ещё не заполнен).
+    """
+    changed_ids = matrix.ids[changed]
+    thresholds = {
+        row['recipe']: row['worst']
+        for row in SimilarRecipe.objects.values('recipe').annotate(
+            worst=Min('score'), total=Count('pk')
+        ).filter(total__gte=SIMILAR_RECIPES_LIMIT)
+    }
+    affected = set(changed.tolist())
+    for chunk in chunked(changed_ids.tolist(), SIMILARITY_BATCH_SIZE):
+        affected.update(matrix.positions(list(
+            SimilarRecipe.objects.filter(
+                similar_id__in=chunk
+            ).values_list('recipe_id', flat=True)
+        )).tolist())
+    for start in range(0, len(changed), SIMILARITY_BATCH_SIZE):
+        scores = matrix.scores(
+            changed[start:start + SIMILARITY_BATCH_SIZE]
+        ).tocoo()
+        for column, value in zip(scores.col.tolist(), scores.data.tolist()):
+            if value > thresholds.get(int(matrix.ids[column]), 0):
+                affected.add(column)
+    return np.array(sorted(affected), dtype=np.int64)
+
+
+def store(neighbours):
+    """Заменяет списки похожих рецептов одной транзакцией на пачку."""
+    with transaction.atomic():
+        SimilarRecipe.objects.filter(
+            recipe_id__in=[recipe_id for recipe_id, _ in neighbours]
+        ).delete()
+        SimilarRecipe.objects.bulk_create([
+            SimilarRecipe(recipe_id=recipe_id, similar_id=similar_id,
+                          score=score)
+            for recipe_id, similar in neighbours
+            for similar_id, score in similar
+        ])
+
+
+def mark_stale(recipe_ids, stale):
+    for chunk in chunked(recipe_ids, SIMILARITY_BATCH_SIZE):
+        Recipe.objects.filter(pk__in=chunk).update(similar_stale=stale)
+
+
+def compute_similar(full=False):
+    """Пересчитывает похожие рецепты и возвращает число пересчитанных.
+
+    Без full обрабатываются только рецепты с similar_stale (изменились
+    ингредиенты или теги) и рецепты, на списки которых они влияют.
+    Флаг снимается до расчёта: изменения во время расчёта попадут
+    в следующий запуск.
+    """
+    stale = list(Recipe.objects.filter(
+        similar_stale=True
+    ).values_list('pk', flat=True))
+    mark_stale(stale, False)
+    try:
+        matrix = RecipeMatrix()
+        if full:
+            positions = np.arange(len(matrix.ids))
+        else:
+            positions = affected_positions(matrix, matrix.positions(stale))
+        for start in range(0, len(positions), SIMILARITY_BATCH_SIZE):
+            store(list(matrix.neighbours(
+                positions[start:start + SIMILARITY_BATCH_SIZE]
+            )))
+    except BaseException:
+        mark_stale(stale, True)
+        raise
+    return len(positions)
@@ -1,12 +1,15 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.contrib.auth.models import Group
+from django.urls import reverse
+from django.utils.html import format_html
 
 from .models import Follow, User
+from foodgram.admin import LargeTableAdminMixin
 
 
 @admin.register(User)
-class UserAdmin(BaseUserAdmin):
+class UserAdmin(LargeTableAdminMixin, BaseUserAdmin):
     """Администрирование пользователей"""
     list_display = (
         'id',
@@ -23,25 +26,33 @@ class UserAdmin(BaseUserAdmin):
         'first_name',
         'last_name',
     )
-    list_filter = ('username', 'email',)
-    search_fields = ('username', 'email',)
+    list_filter = ('is_staff', 'is_active',)
+    search_fields = ('^username', '^email',)
 
-    @admin.display(description='Количество рецептов')
+    @admin.display(description='Количество рецептов',
+                   ordering='recipes_count')
     def get_recipes_count(self, obj):
-        return obj.recipes.count()
-
-    @admin.display(description='Количество подписчиков')
+        return format_html(
+            '<a href="{}?author__id__exact={}">{}</a>',
+            reverse('admin:recipes_recipe_changelist'),
+            obj.pk,
+            obj.recipes_count,
+        )
+
+    @admin.display(description='Количество подписчиков',
+                   ordering='followers_count')
     def get_followers_count(self, obj):
-        return obj.following.count()
+        return obj.followers_count
 
 
 @admin.register(Follow)
-class FollowAdmin(admin.ModelAdmin):
+class FollowAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     """Администрирование подписчиков"""
 
     list_display = ('user', 'author')
-    list_filter = ('user', 'author')
-    search_fields = ('user', 'author')
+    list_select_related = ('user', 'author')
+    search_fields = ('^user__username', '^author__username')
+    autocomplete_fields = ('user', 'author')
 
 
 admin.site.unregister(Group)
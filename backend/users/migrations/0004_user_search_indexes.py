@@ -0,0 +1,39 @@
+# Generated by Django 3.2.16 on 2026-10-18 12:00
+
+from django.db import migrations
+
+INDEXES = (
+    'CREATE INDEX IF NOT EXISTS users_user_username_upper_pattern '
+    'ON users_user (UPPER(username::text) text_pattern_ops)',
+    'CREATE INDEX IF NOT EXISTS users_user_email_upper_pattern '
+    'ON users_user (UPPER(email::text) text_pattern_ops)',
+)
+DROP_INDEXES = (
+    'DROP INDEX IF EXISTS users_user_username_upper_pattern',
+    'DROP INDEX IF EXISTS users_user_email_upper_pattern',
+)
+
+
+def create_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for sql in INDEXES:
+        schema_editor.execute(sql)
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for sql in DROP_INDEXES:
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_user_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
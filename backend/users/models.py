@@ -1,12 +1,30 @@
-from django.contrib.auth.models import AbstractUser
+from django.contrib.auth.models import AbstractUser, UserManager
 from django.core.validators import EmailValidator
 from django.db import models
-from django.db.models import F, CharField, EmailField, Q
+from django.db.models import (BooleanField, CharField, EmailField, Exists, F,
+                              OuterRef, Q, Value)
 
 from foodgram.consts import EMAIL_MAX_LENGTH, USER_MAX_LENGTH
 from .validators import validate_username
 
 
+class UserQuerySet(models.QuerySet):
+    """Кверисет пользователей с признаком подписки текущего пользователя."""
+
+    def with_is_subscribed(self, user):
+        if not user.is_authenticated:
+            return self.annotate(
+                is_subscribed=Value(False, output_field=BooleanField())
+            )
+        return self.annotate(is_subscribed=Exists(
+            Follow.objects.filter(user=user, author=OuterRef('pk'))
+        ))
+
+
+class CustomUserManager(UserManager.from_queryset(UserQuerySet)):
+    """Менеджер пользователей с методами UserQuerySet."""
+
+
 class User(AbstractUser):
     """Кастомная модель пользователя."""
 
@@ -39,6 +57,18 @@ class User(AbstractUser):
         max_length=EMAIL_MAX_LENGTH,
         validators=[EmailValidator]
     )
+    recipes_count = models.PositiveIntegerField(
+        verbose_name='Количество рецептов',
+        default=0,
+        editable=False,
+    )
+    followers_count = models.PositiveIntegerField(
+        verbose_name='Количество подписчиков',
+        default=0,
+        editable=False,
+    )
+
+    objects = CustomUserManager()
 
     class Meta:
         ordering = ('username',)